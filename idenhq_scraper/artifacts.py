@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+
+from config import Config
+
+
+class DebugArtifacts:
+    """Debug screenshots and step trail with levels: "off", "on-error" (default) and "verbose".
+
+    Happy-path steps are recorded as lightweight in-memory snapshots (name, URL, time) in a ring
+    buffer; nothing touches the browser or the disk unless the level is "verbose". Failures
+    capture a screenshot plus the recent trail, and all file writes happen in background tasks.
+    """
+
+    LEVELS = ("off", "on-error", "verbose")
+
+    def __init__(self):
+        self.config = Config()
+        self.level = self.config.DEBUG_ARTIFACT_LEVEL if self.config.DEBUG_ARTIFACT_LEVEL in self.LEVELS else "on-error"
+        self.directory = self.config.DEBUG_ARTIFACT_DIR
+        self.trail = deque(maxlen=self.config.DEBUG_RING_SIZE)
+        self.pending = set()
+
+    def path_for(self, name, extension):
+        return os.path.join(self.directory, f"debug_{name}.{extension}")
+
+    def clear(self):
+        """Removes artifacts left by a previous run."""
+        if not os.path.isdir(self.directory):
+            return
+        for f in os.listdir(self.directory):
+            if f.startswith("debug_") and (f.endswith(".png") or f.endswith(".json")):
+                try: os.remove(os.path.join(self.directory, f))
+                except OSError: pass
+
+    def snapshot(self, page, name):
+        """Records a happy-path step. Costs no browser round-trip unless the level is "verbose"."""
+        if self.level == "off":
+            return
+        self.trail.append({"name": name, "url": page.url if page else None, "time": time.time()})
+        if self.level == "verbose":
+            self.schedule(self.capture_screenshot(page, name))
+
+    async def capture_failure(self, page, name):
+        """Captures a screenshot and the recent step trail for a failure, writing them off the hot path."""
+        if self.level == "off":
+            return
+        self.trail.append({"name": name, "url": page.url if page else None, "time": time.time(), "failure": True})
+        await self.capture_screenshot(page, name)
+        self.schedule(self.write_file(self.path_for(f"{name}_trail", "json"), json.dumps(list(self.trail), indent=2).encode("utf-8")))
+
+    async def capture_screenshot(self, page, name):
+        if page is None or page.is_closed():
+            return
+        try:
+            image = await page.screenshot()
+        except Exception as e:
+            print(f"Warning: Could not capture debug screenshot '{name}': {e}")
+            return
+        await self.write_file(self.path_for(name, "png"), image)
+
+    async def write_file(self, path, data):
+        def write():
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, write)
+        except OSError as e:
+            print(f"Warning: Could not write debug artifact {path}: {e}")
+
+    def schedule(self, coro):
+        """Runs coro in the background, dropping it if too many captures are already in flight."""
+        if len(self.pending) >= self.config.DEBUG_MAX_PENDING_CAPTURES:
+            coro.close()
+            return
+        task = asyncio.ensure_future(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def drain(self):
+        """Waits for in-flight captures; call before closing pages at the end of a run."""
+        if self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
+
+
+debug_artifacts = DebugArtifacts()
@@ -1,16 +1,25 @@
 import os
 import json
+import time
 import asyncio
+from urllib.parse import urlparse
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
 from config import Config
+from waits import PageWaiter
+from artifacts import debug_artifacts
+from metrics import metrics
+from browser_profile import browser_profile
+from selector_cache import selector_resolver
+from pacing import pacing
+from budget import budget
 class Authenticator:
     def __init__(self):
         self.config = Config()
+        self.waiter = PageWaiter()
     
     async def wait_for_element_robust(self, page, selector, timeout=None, state="visible"):
         """Waits for an element using locator with specific state and timeout."""
-        if timeout is None:
-            timeout = self.config.DEFAULT_TIMEOUT
+        timeout = budget.timeout(self.config.DEFAULT_TIMEOUT if timeout is None else timeout)
             
         print(f"Waiting for selector '{selector}' to be {state} (timeout: {timeout/1000}s)...")
         try:
@@ -18,6 +27,7 @@ class Authenticator:
             print(f"Selector '{selector}' found and is {state}.")
             return True
         except PlaywrightTimeoutError:
+            metrics.incr("timeouts", "wait_for_element")
             print(f"Timeout waiting for selector '{selector}' after {timeout/1000} seconds.")
             return False
         except PlaywrightError as e:
@@ -32,36 +42,33 @@ class Authenticator:
     
     async def click_element(self, page, selector, description, timeout=None):
         """Clicks an element with robust waiting and error handling."""
-        if timeout is None:
-            timeout = self.config.DEFAULT_TIMEOUT
+        timeout = budget.timeout(self.config.DEFAULT_TIMEOUT if timeout is None else timeout)
             
         print(f"Attempting to click '{description}' (selector: {selector})...")
         try:
-            element = page.locator(selector).first
-            await element.wait_for(state="visible", timeout=timeout)
-            print(f"Element '{description}' visible.")
-            await asyncio.sleep(0.2)
-            
-            if await element.is_enabled(timeout=self.config.SHORT_TIMEOUT):
-                print(f"Element '{description}' enabled.")
-                await element.click(timeout=self.config.SHORT_TIMEOUT*2)
-                print(f"Successfully clicked '{description}'.")
-                try:
-                    if not page.is_closed():
-                        await page.screenshot(path=f"debug_after_click_{description.replace(' ', '_').lower()}.png")
-                except PlaywrightError as screen_err:
-                    print(f"Warning: Could not take screenshot after clicking {description}: {screen_err}")
-                await asyncio.sleep(1.0)
+            async with pacing.request("click"):
+                element = await selector_resolver.locate(page, description, selector, timeout=timeout)
+                print(f"Element '{description}' visible.")
+                enabled = await element.is_enabled(timeout=self.config.SHORT_TIMEOUT)
+                if enabled:
+                    print(f"Element '{description}' enabled.")
+                    await element.click(timeout=self.config.SHORT_TIMEOUT*2)
+                    print(f"Successfully clicked '{description}'.")
+                    debug_artifacts.snapshot(page, f"after_click_{description.replace(' ', '_').lower()}")
+                    await self.waiter.wait_for_dom_settled(page, timeout=self.config.POST_CLICK_SETTLE_TIMEOUT)
+            
+            if enabled:
                 return True
             else:
                 print(f"Error: Element '{description}' found but is not enabled.")
                 if not page.is_closed(): 
-                    await page.screenshot(path=f"debug_failed_click_{description.replace(' ', '_').lower()}_disabled.png")
+                    await debug_artifacts.capture_failure(page, f"failed_click_{description.replace(' ', '_').lower()}_disabled")
                 return False
         except PlaywrightTimeoutError as e:
+            metrics.incr("timeouts", "click_element")
             print(f"Timeout error during action for '{description}': {e}")
             if not page.is_closed(): 
-                await page.screenshot(path=f"debug_failed_click_{description.replace(' ', '_').lower()}_timeout.png")
+                await debug_artifacts.capture_failure(page, f"failed_click_{description.replace(' ', '_').lower()}_timeout")
             return False
         except PlaywrightError as e:
             if "closed" in str(e).lower():
@@ -70,7 +77,7 @@ class Authenticator:
                 print(f"Playwright error clicking '{description}': {e}")
             try:
                 if not page.is_closed(): 
-                    await page.screenshot(path=f"debug_failed_click_{description.replace(' ', '_').lower()}_playwright_error.png")
+                    await debug_artifacts.capture_failure(page, f"failed_click_{description.replace(' ', '_').lower()}_playwright_error")
             except Exception: 
                 pass
             return False
@@ -78,7 +85,7 @@ class Authenticator:
             print(f"Unexpected error clicking '{description}': {e}")
             try:
                 if not page.is_closed(): 
-                    await page.screenshot(path=f"debug_failed_click_{description.replace(' ', '_').lower()}_unexpected_error.png")
+                    await debug_artifacts.capture_failure(page, f"failed_click_{description.replace(' ', '_').lower()}_unexpected_error")
             except Exception: 
                 pass
             return False
@@ -89,12 +96,12 @@ class Authenticator:
         page = None
         print("Attempting new login...")
         try:
-            context = await browser.new_context(ignore_https_errors=True)
+            context = await browser_profile.new_context(browser)
             page = await context.new_page()
             print(f"Navigating to {self.config.BASE_URL}...")
-            await page.goto(self.config.BASE_URL, wait_until="domcontentloaded", timeout=self.config.LONG_TIMEOUT)
+            await page.goto(self.config.BASE_URL, wait_until="domcontentloaded", timeout=budget.timeout(self.config.LONG_TIMEOUT))
             print("Page loaded. Looking for login fields.")
-            await page.screenshot(path="debug_login_page_initial.png")
+            debug_artifacts.snapshot(page, "login_page_initial")
             
             if not await self.wait_for_element_robust(page, self.config.LOGIN_USERNAME_SELECTOR):
                 raise Exception("Login username field not found.")
@@ -104,39 +111,41 @@ class Authenticator:
             await page.locator(self.config.LOGIN_USERNAME_SELECTOR).first.fill(self.config.CREDENTIALS["username"])
             await page.locator(self.config.LOGIN_PASSWORD_SELECTOR).first.fill(self.config.CREDENTIALS["password"])
             print("Credentials filled.")
-            await page.screenshot(path="debug_login_fields_filled.png")
+            debug_artifacts.snapshot(page, "login_fields_filled")
             
             if not await self.click_element(page, self.config.LOGIN_SUBMIT_SELECTOR, "Login Submit Button"):
                 print("Login submit click failed. Trying password field Enter keypress...")
+                metrics.incr("retries", "login_enter_keypress")
                 await page.locator(self.config.LOGIN_PASSWORD_SELECTOR).first.press('Enter')
-                await asyncio.sleep(1)
+                await self.waiter.wait_for_dom_settled(page, timeout=self.config.POST_CLICK_SETTLE_TIMEOUT)
             
             print("Waiting for navigation or Launch button after login submission...")
             try:
-                await page.wait_for_load_state('networkidle', timeout=self.config.LONG_TIMEOUT)
+                await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.LONG_TIMEOUT))
                 if self.config.INSTRUCTIONS_URL_PART in page.url:
                     print(f"Successfully navigated to URL containing '{self.config.INSTRUCTIONS_URL_PART}'.")
                 else:
                     print(f"Did not navigate to '{self.config.INSTRUCTIONS_URL_PART}' URL directly. Checking for '{self.config.LAUNCH_CHALLENGE_SELECTOR}'. Current URL: {page.url}")
                     if not await self.wait_for_element_robust(page, self.config.LAUNCH_CHALLENGE_SELECTOR):
-                        await page.screenshot(path="debug_login_failed_no_nav_no_button.png")
+                        await debug_artifacts.capture_failure(page, "login_failed_no_nav_no_button")
                         raise PlaywrightTimeoutError(f"Login failed: Neither navigated to '{self.config.INSTRUCTIONS_URL_PART}' nor found '{self.config.LAUNCH_CHALLENGE_SELECTOR}' after submission.")
                     else:
                         print(f"Found '{self.config.LAUNCH_CHALLENGE_SELECTOR}', assuming login successful despite slow navigation.")
             except PlaywrightTimeoutError:
+                metrics.incr("timeouts", "login_networkidle")
                 print(f"Timeout waiting for page idle or navigation after login. Checking for '{self.config.LAUNCH_CHALLENGE_SELECTOR}'.")
                 if not await self.wait_for_element_robust(page, self.config.LAUNCH_CHALLENGE_SELECTOR):
-                    await page.screenshot(path="debug_login_failed_timeout_no_button.png")
+                    await debug_artifacts.capture_failure(page, "login_failed_timeout_no_button")
                     raise PlaywrightTimeoutError(f"Login failed: Timeout after submission and '{self.config.LAUNCH_CHALLENGE_SELECTOR}' not found.")
                 else:
                     print(f"Found '{self.config.LAUNCH_CHALLENGE_SELECTOR}' after timeout, assuming login successful.")
             
             if not await self.wait_for_element_robust(page, self.config.LAUNCH_CHALLENGE_SELECTOR, timeout=self.config.SHORT_TIMEOUT):
-                await page.screenshot(path="debug_login_success_but_no_button_final.png")
+                await debug_artifacts.capture_failure(page, "login_success_but_no_button_final")
                 raise Exception(f"Login likely succeeded but couldn't find '{self.config.LAUNCH_CHALLENGE_SELECTOR}' reliably.")
             
             print("Authentication successful (verified by presence of Launch Challenge button).")
-            await page.screenshot(path="debug_login_successful.png")
+            debug_artifacts.snapshot(page, "login_successful")
             
             storage_state = await context.storage_state()
             with open(self.config.SESSION_FILE, "w") as f:
@@ -145,10 +154,14 @@ class Authenticator:
             
             return context
         
+        except asyncio.CancelledError:
+            print("Login cancelled; closing its context.")
+            await self.discard(page, context)
+            raise
         except Exception as e:
             print(f"Authentication failed - Error during login: {e}")
             if page and not page.is_closed():
-                try: await page.screenshot(path="debug_login_failed_error.png")
+                try: await debug_artifacts.capture_failure(page, "login_failed_error")
                 except Exception: pass
             if page and not page.is_closed():
                 try: await page.close()
@@ -158,7 +171,7 @@ class Authenticator:
                 except Exception: pass
             return None
     
-    async def load_session(self, browser):
+    async def load_session(self, browser, remove_on_failure=True):
         """Loads session, verifies landing on instructions or challenge page."""
         if not os.path.exists(self.config.SESSION_FILE):
             print("Session file not found.")
@@ -172,18 +185,19 @@ class Authenticator:
                 storage_state = json.load(f)
             if not storage_state or 'cookies' not in storage_state or 'origins' not in storage_state:
                 print("Session file content is invalid.")
-                os.remove(self.config.SESSION_FILE)
-                print("Removed invalid session file.")
+                if remove_on_failure:
+                    os.remove(self.config.SESSION_FILE)
+                    print("Removed invalid session file.")
                 return None
             
-            context = await browser.new_context(storage_state=storage_state, ignore_https_errors=True)
+            context = await browser_profile.new_context(browser, storage_state=storage_state)
             page = await context.new_page()
             print(f"Navigating to {self.config.BASE_URL + self.config.INSTRUCTIONS_URL_PART} with loaded session...")
             await page.goto(self.config.BASE_URL + self.config.INSTRUCTIONS_URL_PART, 
                           wait_until="domcontentloaded", 
-                          timeout=self.config.LONG_TIMEOUT)
+                          timeout=budget.timeout(self.config.LONG_TIMEOUT))
             print("Page loaded with session. Validating...")
-            await page.screenshot(path="debug_session_load_page.png")
+            debug_artifacts.snapshot(page, "session_load_page")
             
             current_url = page.url
             on_instructions = self.config.INSTRUCTIONS_URL_PART in current_url
@@ -199,17 +213,21 @@ class Authenticator:
                 print(f"Session valid: Not on instructions page (URL: {current_url}), but Launch button found.")
             else:
                 print(f"Session invalid or expired (URL: {current_url}, Launch button not found).")
-                await page.screenshot(path="debug_session_invalid.png")
+                await debug_artifacts.capture_failure(page, "session_invalid")
                 raise Exception("Session validation failed")
             
             print("Session validation successful.")
-            await page.screenshot(path="debug_session_valid.png")
+            debug_artifacts.snapshot(page, "session_valid")
             return context
         
+        except asyncio.CancelledError:
+            print("Session restore cancelled; closing its context.")
+            await self.discard(page, context)
+            raise
         except Exception as e:
             print(f"Session loading/validation failed: {e}")
             if page and not page.is_closed():
-                try: await page.screenshot(path="debug_session_load_failed.png")
+                try: await debug_artifacts.capture_failure(page, "session_load_failed")
                 except Exception: pass
             if page and not page.is_closed():
                 try: await page.close()
@@ -217,10 +235,135 @@ class Authenticator:
             if context:
                 try: await context.close()
                 except Exception: pass
-            if os.path.exists(self.config.SESSION_FILE):
+            if remove_on_failure and os.path.exists(self.config.SESSION_FILE):
                 try:
                     os.remove(self.config.SESSION_FILE)
                     print(f"Removed potentially invalid session file: {self.config.SESSION_FILE}")
                 except OSError as remove_err:
                     print(f"Warning: Could not remove session file {self.config.SESSION_FILE}: {remove_err}")
-            return None
\ No newline at end of file
+            return None
+    
+    async def discard(self, page, context):
+        """Closes a page and context without raising, e.g. for the losing side of a session race."""
+        for target in (page, context):
+            if target:
+                try: await target.close()
+                except Exception: pass
+    
+    async def probe_session(self, browser):
+        """Cheaply classifies the stored session as "valid", "expired" or "unknown" without rendering a page.
+
+        Checks cookie expiry first, then fetches the instructions page over the context's request API
+        (no redirects followed): a redirect or 401/403 means expired, and a 200 whose HTML already
+        contains SESSION_PROBE_MARKER means valid. A client-rendered 200 is inconclusive.
+        """
+        if not os.path.exists(self.config.SESSION_FILE):
+            return "expired"
+        try:
+            with open(self.config.SESSION_FILE, "r") as f:
+                storage_state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read session file: {e}")
+            return "expired"
+        if not storage_state or 'cookies' not in storage_state or 'origins' not in storage_state:
+            return "expired"
+        
+        host = urlparse(self.config.BASE_URL).hostname or ""
+        now = time.time()
+        site_cookies = [c for c in storage_state["cookies"] if host.endswith(c.get("domain", "").lstrip("."))]
+        live_cookies = [c for c in site_cookies if c.get("expires", -1) < 0 or c["expires"] > now]
+        has_local_storage = any(origin.get("localStorage") for origin in storage_state["origins"])
+        if not live_cookies:
+            if not has_local_storage:
+                print(f"Stored session has no live cookies for {host} ({len(site_cookies)} expired).")
+                return "expired"
+            # Auth may live in localStorage, which a bare request cannot carry
+            return "unknown"
+        
+        context = None
+        try:
+            # Same profile as the real restore (HTTPS errors, headers), so both reach the same verdict
+            context = await browser_profile.new_context(browser, storage_state=storage_state)
+            response = await context.request.get(
+                self.config.BASE_URL + self.config.INSTRUCTIONS_URL_PART,
+                max_redirects=0,
+                timeout=self.config.SESSION_PROBE_TIMEOUT,
+            )
+            if response.status in (401, 403) or 300 <= response.status < 400:
+                print(f"Session probe: HTTP {response.status}, session expired.")
+                return "expired"
+            if response.ok and self.config.SESSION_PROBE_MARKER in await response.text():
+                print("Session probe: authenticated page served, session valid.")
+                return "valid"
+            print(f"Session probe: HTTP {response.status} without a conclusive marker.")
+            return "unknown"
+        except Exception as e:
+            print(f"Session probe failed: {e}")
+            return "unknown"
+        finally:
+            if context:
+                try: await context.close()
+                except Exception: pass
+    
+    async def timed(self, name, attempt):
+        """Awaits a restore or login attempt and records it as span name (session.restore / session.login).
+        
+        A race loser that gets cancelled is not recorded, since its time says nothing about that step.
+        """
+        started = time.perf_counter()
+        try:
+            result = await attempt
+        except Exception:
+            metrics.record(name, time.perf_counter() - started)
+            raise
+        metrics.record(name, time.perf_counter() - started)
+        return result
+    
+    async def race_session(self, browser):
+        """Races session restore against a fresh login; the first to yield a context wins and the other is cancelled."""
+        tasks = {
+            asyncio.ensure_future(self.timed("session.restore", self.load_session(browser, remove_on_failure=False))): "restore",
+            asyncio.ensure_future(self.timed("session.login", self.login(browser))): "login",
+        }
+        pending = set(tasks)
+        winner = None
+        try:
+            while pending and not winner:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    context = task.result()
+                    if context and not winner:
+                        winner = context
+                        print(f"Session race won by {tasks[task]}.")
+                        metrics.incr("session", f"race_{tasks[task]}_won")
+                    elif context:
+                        await context.close()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return winner
+    
+    async def establish_session(self, browser):
+        """Gets an authenticated context: restore or login outright when the probe is conclusive, otherwise race both."""
+        if self.config.SESSION_STARTUP_MODE != "race":
+            context = await self.timed("session.restore", self.load_session(browser))
+            if not context:
+                print("Could not load valid session, attempting new login.")
+                context = await self.timed("session.login", self.login(browser))
+            return context
+        
+        with metrics.span("session.probe"):
+            verdict = await self.probe_session(browser)
+        metrics.incr("session", f"probe_{verdict}")
+        if verdict == "expired":
+            print("Stored session is expired or missing; logging in directly.")
+            return await self.timed("session.login", self.login(browser))
+        if verdict == "valid":
+            context = await self.timed("session.restore", self.load_session(browser))
+            if context:
+                return context
+            print("Probed session failed to restore, attempting new login.")
+            return await self.timed("session.login", self.login(browser))
+        print("Session state inconclusive; racing restore against a fresh login.")
+        return await self.race_session(browser)
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from playwright.async_api import async_playwright
+
+from config import Config
+from auth import Authenticator
+from navigator import Navigator
+from scraper import ProductScraper
+from sink import JsonlSink
+from fixture_server import FixtureServer
+from selector_cache import selector_resolver
+
+STRATEGIES = {
+    "batch": {"BATCH_EXTRACTION": True, "NETWORK_CAPTURE": False},
+    "per-field": {"BATCH_EXTRACTION": False, "NETWORK_CAPTURE": False},
+    "capture": {"BATCH_EXTRACTION": True, "NETWORK_CAPTURE": True},
+}
+
+
+async def browser_js_heap_mb(page):
+    """Renderer JS heap in use, read over CDP (Chromium only)."""
+    try:
+        cdp = await page.context.new_cdp_session(page)
+        await cdp.send("Performance.enable")
+        metrics = {m["name"]: m["value"] for m in (await cdp.send("Performance.getMetrics"))["metrics"]}
+        return round(metrics.get("JSHeapUsedSize", 0) / 1024 / 1024, 2)
+    except Exception as e:
+        print(f"Could not read browser heap metrics: {e}")
+        return None
+
+
+async def run_once(base_url, strategy, headless=True):
+    """Runs login, challenge navigation and a full scrape against base_url and returns timing/memory stats.
+
+    Expects a fresh working directory, so no session, navigation shortcut or selector cache file carries over.
+    """
+    for name, value in STRATEGIES[strategy].items():
+        setattr(Config, name, value)
+    Config.BASE_URL = base_url
+    # Pins loaded at import (or by an earlier strategy) would skew navigation and per-card timings
+    selector_resolver.pins = {}
+    selector_resolver.dirty = False
+
+    result = {"strategy": strategy}
+    tracemalloc.start()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            auth_manager = Authenticator()
+            navigator = Navigator()
+            scraper = ProductScraper()
+
+            start = time.perf_counter()
+            context = await auth_manager.login(browser)
+            result["login_s"] = round(time.perf_counter() - start, 3)
+            if not context:
+                result["error"] = "login failed"
+                return result
+
+            page = context.pages[0]
+            scraper.start_capture(page)
+            start = time.perf_counter()
+            navigated = await navigator.navigate_challenge_flow(page)
+            result["navigation_s"] = round(time.perf_counter() - start, 3)
+            if not navigated:
+                result["error"] = "navigation failed"
+                return result
+
+            with JsonlSink(Config.JSONL_OUTPUT_FILE, batch_size=Config.SINK_BATCH_SIZE) as sink:
+                start = time.perf_counter()
+                cards = await scraper.scrape_product_data(page, sink=sink)
+                elapsed = time.perf_counter() - start
+            result["scrape_s"] = round(elapsed, 3)
+            result["cards"] = cards
+            result["cards_per_sec"] = round(cards / elapsed, 2) if elapsed else None
+            result["browser_js_heap_mb"] = await browser_js_heap_mb(page)
+        finally:
+            await browser.close()
+    # Don't let the exit flush write this run's pins into the caller's directory
+    selector_resolver.pins = {}
+    selector_resolver.dirty = False
+    result["python_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    tracemalloc.stop()
+    # ru_maxrss is KiB on Linux
+    result["process_max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+    return result
+
+
+async def run_benchmark(args):
+    output = os.path.abspath(args.output) if args.output else None
+    server = FixtureServer(args.products, args.page_size, args.mode, args.latency_ms)
+    base_url = server.start()
+    original_dir = os.getcwd()
+    results = []
+    try:
+        for strategy in args.strategy:
+            print(f"\n=== Benchmark: {strategy} ({args.products} products, {args.mode}, {args.latency_ms}ms latency) ===")
+            # Every strategy starts from an empty workdir: no session, nav shortcut, selector cache or outputs
+            os.chdir(tempfile.mkdtemp(prefix=f"idenhq_bench_{strategy}_"))
+            results.append(await run_once(base_url, strategy, headless=not args.headed))
+    finally:
+        os.chdir(original_dir)
+        server.stop()
+
+    print("\n=== Benchmark Results ===")
+    columns = ["strategy", "login_s", "navigation_s", "scrape_s", "cards", "cards_per_sec", "python_peak_mb", "browser_js_heap_mb", "process_max_rss_mb"]
+    print(" | ".join(columns))
+    for result in results:
+        print(" | ".join(str(result.get(column, "-")) for column in columns))
+    report = {
+        "fixture": {"products": args.products, "page_size": args.page_size, "mode": args.mode, "latency_ms": args.latency_ms},
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against the local fixture server")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--mode", choices=["pagination", "scroll"], default="pagination")
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--strategy", nargs="+", choices=list(STRATEGIES), default=["batch"])
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
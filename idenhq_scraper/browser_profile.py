@@ -0,0 +1,77 @@
+import re
+
+from config import Config
+from metrics import metrics
+
+# Turns off CSS animations/transitions and smooth scrolling as soon as the document exists.
+DISABLE_ANIMATIONS_SCRIPT = """
+(() => {
+    const css = "*, *::before, *::after { animation: none !important; transition: none !important; "
+        + "scroll-behavior: auto !important; caret-color: transparent !important; }";
+    const install = () => {
+        const style = document.createElement("style");
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) {
+        install();
+    } else {
+        document.addEventListener("DOMContentLoaded", install, { once: true });
+    }
+})();
+"""
+
+
+class BrowserProfile:
+    """Context options and request interception shared by every browser context the scraper creates.
+
+    The lean profile blocks resource types and URL patterns the scraper never reads (images, media,
+    fonts, analytics), disables animations and uses a small viewport. Documents, scripts, stylesheets
+    and XHR/fetch are left alone so selectors, visibility checks and network capture keep working.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.enabled = self.config.LEAN_BROWSER_PROFILE
+        self.blocked_types = set(self.config.BLOCKED_RESOURCE_TYPES)
+        self.blocked_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.config.BLOCKED_URL_PATTERNS]
+
+    def context_options(self, **overrides):
+        options = {"ignore_https_errors": True}
+        if self.enabled:
+            options.update({
+                "viewport": self.config.LEAN_VIEWPORT,
+                "reduced_motion": "reduce",
+                # Service workers would serve requests outside our route handler
+                "service_workers": "block",
+            })
+        options.update(overrides)
+        return options
+
+    async def new_context(self, browser, **overrides):
+        """Creates a browser context with this profile applied."""
+        context = await browser.new_context(**self.context_options(**overrides))
+        await self.apply(context)
+        return context
+
+    async def apply(self, context):
+        if not self.enabled:
+            return
+        await context.add_init_script(DISABLE_ANIMATIONS_SCRIPT)
+        await context.route("**/*", self.handle_route)
+
+    def should_block(self, request):
+        if request.resource_type in self.blocked_types:
+            return True
+        return any(pattern.search(request.url) for pattern in self.blocked_patterns)
+
+    async def handle_route(self, route):
+        request = route.request
+        if self.should_block(request):
+            metrics.incr("blocked_requests", request.resource_type)
+            await route.abort()
+        else:
+            await route.continue_()
+
+
+browser_profile = BrowserProfile()
@@ -0,0 +1,134 @@
+import time
+import contextvars
+
+from config import Config
+from metrics import metrics
+
+# Run deadline and innermost deadline of the running task; asyncio tasks (workers, daemon slots) each get their own copy
+current_run = contextvars.ContextVar("current_run", default=None)
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+
+class Deadline:
+    """A wall-clock budget that never outlives the deadline it was opened under."""
+
+    __slots__ = ("name", "expires_at", "parent")
+
+    def __init__(self, name, seconds=None, parent=None):
+        self.name = name
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self.parent = parent
+
+    def remaining(self):
+        """Seconds left (possibly negative), or None when neither this nor any enclosing deadline is bounded."""
+        left = None if self.expires_at is None else self.expires_at - time.monotonic()
+        if self.parent is not None:
+            parent_left = self.parent.remaining()
+            if parent_left is not None:
+                left = parent_left if left is None else min(left, parent_left)
+        return left
+
+    def expired(self):
+        left = self.remaining()
+        return left is not None and left <= 0
+
+
+class PhaseScope:
+    """Makes a Deadline the current one for a `with` block."""
+
+    __slots__ = ("deadline", "token")
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.token = None
+
+    def __enter__(self):
+        self.token = current_deadline.set(self.deadline)
+        return self.deadline
+
+    def __exit__(self, exc_type, exc, tb):
+        current_deadline.reset(self.token)
+        if self.deadline.expired():
+            metrics.incr("budget_exhausted", self.deadline.name)
+        return False
+
+
+class RunBudget:
+    """Run-level deadline with nested per-phase and per-card budgets.
+
+    Every Playwright timeout that goes through timeout() is capped by whatever is left of the innermost
+    budget, and scaled down once the run is within RUN_DEADLINE_TAIL seconds of its deadline, so a slow
+    or broken target cannot stack full-length waits. Fields that keep missing on this card layout are
+    probed with ABSENT_FIELD_TIMEOUT instead of their full timeout.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.unbounded = Deadline("run")
+        self.field_misses = {}  # field -> consecutive cards without it
+
+    def start(self, seconds=None):
+        """Starts the run clock for the calling task (and tasks it spawns); seconds defaults to RUN_DEADLINE (None = unbounded)."""
+        seconds = self.config.RUN_DEADLINE if seconds is None else seconds
+        current_run.set(Deadline("run", seconds))
+        self.field_misses = {}
+        current_deadline.set(None)
+        if seconds is not None:
+            print(f"Run deadline: {seconds}s.")
+
+    def clear(self):
+        """Drops the calling task's run deadline (e.g. a daemon slot between jobs)."""
+        current_run.set(None)
+        current_deadline.set(None)
+
+    @property
+    def run(self):
+        return current_run.get() or self.unbounded
+
+    def current(self):
+        return current_deadline.get() or self.run
+
+    def phase(self, name, seconds=None):
+        """`with budget.phase("navigation"):` bounds a phase by PHASE_BUDGETS[name] and the enclosing deadline."""
+        if seconds is None:
+            seconds = self.config.PHASE_BUDGETS.get(name)
+        return PhaseScope(Deadline(name, seconds, self.current()))
+
+    def card(self):
+        """Budget for extracting one product card."""
+        return self.phase("card", self.config.CARD_BUDGET)
+
+    def remaining(self):
+        return self.current().remaining()
+
+    def expired(self):
+        return self.current().expired()
+
+    def timeout(self, cap_ms):
+        """cap_ms bounded by the time left in the current budget and shrunk near the run deadline (never 0, which Playwright treats as no timeout)."""
+        run_left = self.run.remaining()
+        if run_left is not None and run_left < self.config.RUN_DEADLINE_TAIL:
+            cap_ms *= max(run_left, 0) / self.config.RUN_DEADLINE_TAIL
+        left = self.remaining()
+        if left is not None:
+            cap_ms = min(cap_ms, left * 1000)
+        return max(self.config.MIN_OPERATION_TIMEOUT, int(cap_ms))
+
+    def field_timeout(self, field, cap_ms):
+        """Timeout for looking up field on a card; fast-fails fields this layout has repeatedly lacked."""
+        if self.field_misses.get(field, 0) >= self.config.ABSENT_FIELD_AFTER_MISSES:
+            return min(self.config.ABSENT_FIELD_TIMEOUT, self.timeout(cap_ms))
+        return self.timeout(cap_ms)
+
+    def field_seen(self, field, found):
+        """Records whether field was present on the last card."""
+        misses = self.field_misses.get(field, 0)
+        if found:
+            self.field_misses[field] = 0
+            return
+        self.field_misses[field] = misses + 1
+        if misses + 1 == self.config.ABSENT_FIELD_AFTER_MISSES:
+            print(f"Field '{field}' missing on {misses + 1} cards in a row; probing it with a short timeout from now on.")
+
+
+budget = RunBudget()
@@ -0,0 +1,122 @@
+import re
+import asyncio
+from playwright.async_api import Error as PlaywrightError
+
+from config import Config
+
+# Keys an inventory API is likely to use for the fields the DOM scraper emits first
+NAME_KEYS = ("name", "title", "product_name", "productName")
+FIELD_ALIASES = {
+    "title": "name",
+    "product_name": "name",
+    "product_id": "id",
+    "category_name": "category",
+    "updated_at": "last_updated",
+}
+
+
+def to_snake_case(key):
+    key = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", str(key))
+    return re.sub(r"[^0-9a-zA-Z]+", "_", key).strip("_").lower()
+
+
+def find_record_list(payload):
+    """Returns the largest list of product-like dicts found anywhere in a JSON payload."""
+    best = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            dicts = [item for item in node if isinstance(item, dict)]
+            if dicts and any(key in item for item in dicts for key in NAME_KEYS) and len(dicts) > len(best):
+                best = dicts
+            stack.extend(node)
+    return best
+
+
+def normalize_api_record(raw):
+    """Maps an API record onto the DOM scraper's keys (name, id, category, snake_case details)."""
+    record = {}
+    for key, value in raw.items():
+        if isinstance(value, (dict, list)):
+            continue
+        key = to_snake_case(key)
+        key = FIELD_ALIASES.get(key, key)
+        if key not in record:
+            record[key] = value
+    ordered = {field: record.pop(field) for field in ("name", "id", "category") if field in record}
+    ordered.update(record)
+    return ordered
+
+
+class NetworkCapture:
+    """Collects inventory records from the SPA's XHR/fetch JSON responses."""
+
+    def __init__(self):
+        self.config = Config()
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.config.CAPTURE_URL_PATTERNS]
+        self.records = []
+        self.page = None
+        self.records_ready = asyncio.Event()
+
+    def is_attached(self):
+        return self.page is not None
+
+    def attach(self, page):
+        """Starts listening to responses on page. Must run before the inventory data is requested."""
+        if self.page is not None:
+            return
+        self.page = page
+        page.on("response", self.handle_response)
+        print(f"Network capture attached (patterns: {self.config.CAPTURE_URL_PATTERNS}).")
+
+    def detach(self):
+        if self.page is None:
+            return
+        try:
+            self.page.remove_listener("response", self.handle_response)
+        except Exception as e:
+            print(f"Warning: Could not detach network capture: {e}")
+        self.page = None
+        self.take_records()
+
+    def matches(self, response):
+        """True for fetch/XHR responses whose URL matches one of the configured data endpoints."""
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return False
+        return any(pattern.search(response.url) for pattern in self.patterns)
+
+    async def handle_response(self, response):
+        if not self.matches(response):
+            return
+        try:
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            payload = await response.json()
+        except (PlaywrightError, ValueError) as e:
+            print(f"Could not read captured response {response.url}: {e}")
+            return
+        raw_records = find_record_list(payload)
+        if not raw_records:
+            return
+        self.records.extend(normalize_api_record(raw) for raw in raw_records)
+        self.records_ready.set()
+        print(f"Captured {len(raw_records)} records from {response.url}.")
+
+    def take_records(self):
+        """Returns and clears every record captured since the last call."""
+        records, self.records = self.records, []
+        self.records_ready.clear()
+        return records
+
+    async def wait_for_records(self, timeout):
+        """Waits up to timeout (ms) for a captured payload. Returns True if records are available."""
+        if self.records:
+            return True
+        try:
+            await asyncio.wait_for(self.records_ready.wait(), timeout / 1000)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,42 @@
+import os
+import json
+import time
+
+from config import Config
+
+
+class ScrapeCheckpoint:
+    """Atomically persisted record of the last fully completed page, so a crashed scrape can resume."""
+
+    def __init__(self, path=None):
+        self.config = Config()
+        self.path = path or self.config.CHECKPOINT_FILE
+
+    def load(self):
+        """Returns the saved checkpoint dict, or None if there is no usable checkpoint."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read checkpoint {self.path}: {e}")
+            return None
+        if not isinstance(state, dict) or "last_page" not in state or "output_offset" not in state:
+            print(f"Checkpoint {self.path} is incomplete; ignoring it.")
+            return None
+        return state
+
+    def save(self, state):
+        """Writes state via a temp file and rename so a crash never leaves a half-written checkpoint."""
+        state = dict(state, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,129 @@
+import os
+from datetime import date
+
+from config import Config
+from records import ProductRecord
+from sink import iter_jsonl
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pa = None
+    pq = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy
+    np = None
+
+# Fixed column schema derived from the card fields (see records.ProductRecord); other labels are not exported
+SCHEMA = (
+    ("name", "string"),
+    ("id", "string"),
+    ("category", "string"),
+    ("color", "string"),
+    ("warranty", "string"),
+    ("weight_kg", "float"),
+    ("rating", "float"),
+    ("price_cents", "int"),
+    ("size_x", "float"),
+    ("size_y", "float"),
+    ("size_z", "float"),
+    ("size_unit", "string"),
+    ("last_updated", "date"),
+    ("footer_last_updated", "date"),
+)
+
+
+def typed_row(record):
+    """Maps a JSONL record (typed or raw) onto the SCHEMA columns."""
+    if "price_cents" not in record:
+        record = ProductRecord.from_raw(record).to_dict()
+    size = record.get("size") or [None, None, None]
+    row = {name: record.get(name) for name, _ in SCHEMA}
+    row["size_x"], row["size_y"], row["size_z"] = size
+    for name, kind in SCHEMA:
+        if kind == "date" and row[name]:
+            row[name] = date.fromisoformat(row[name])
+        elif kind == "string" and row[name] is not None:
+            row[name] = str(row[name])
+    return row
+
+
+def available_format(requested):
+    """Resolves "auto" to parquet (pyarrow) or npz (numpy); None if the needed library is missing."""
+    if requested == "auto":
+        return "parquet" if pa else "npz" if np else None
+    if requested == "parquet":
+        return "parquet" if pa else None
+    if requested == "npz":
+        return "npz" if np else None
+    return None
+
+
+class ColumnarWriter:
+    """Exports the JSONL product stream as Parquet (row groups, memory-mappable) or a NumPy .npz of column arrays."""
+
+    def __init__(self, fmt=None):
+        self.config = Config()
+        self.requested = fmt or self.config.COLUMNAR_OUTPUT
+
+    def write(self, jsonl_path, output_path=None):
+        """Writes the columnar file and returns its path, or None when disabled or the library is unavailable."""
+        if self.requested == "off":
+            return None
+        fmt = available_format(self.requested)
+        if fmt is None:
+            print(f"Columnar output '{self.requested}' needs pyarrow or numpy, which are not installed. Skipping.")
+            return None
+        output_path = output_path or (self.config.PARQUET_OUTPUT_FILE if fmt == "parquet" else self.config.NPZ_OUTPUT_FILE)
+        tmp_path = output_path + ".tmp"
+        rows = self.write_parquet(jsonl_path, tmp_path) if fmt == "parquet" else self.write_npz(jsonl_path, tmp_path)
+        os.replace(tmp_path, output_path)
+        print(f"Wrote {rows} products to {output_path} ({fmt}).")
+        return output_path
+
+    def arrow_schema(self):
+        types = {"string": pa.string(), "float": pa.float64(), "int": pa.int64(), "date": pa.date32()}
+        return pa.schema([(name, types[kind]) for name, kind in SCHEMA])
+
+    def write_parquet(self, jsonl_path, path):
+        schema = self.arrow_schema()
+        rows = 0
+        batch = []
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for record in iter_jsonl(jsonl_path):
+                batch.append(typed_row(record))
+                if len(batch) >= self.config.COLUMNAR_ROW_GROUP_SIZE:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    rows += len(batch)
+                    batch = []
+            if batch or not rows:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows += len(batch)
+        return rows
+
+    def write_npz(self, jsonl_path, path):
+        columns = {name: [] for name, _ in SCHEMA}
+        for record in iter_jsonl(jsonl_path):
+            row = typed_row(record)
+            for name in columns:
+                columns[name].append(row[name])
+        arrays = {}
+        for name, kind in SCHEMA:
+            values = columns[name]
+            if kind == "string":
+                arrays[name] = np.array(["" if v is None else v for v in values], dtype=str)
+            elif kind == "float":
+                arrays[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            elif kind == "int":
+                # Integers have no NaN; a parallel mask marks which values are present
+                arrays[name] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+                arrays[f"{name}_valid"] = np.array([v is not None for v in values], dtype=bool)
+            else:
+                arrays[name] = np.array(["NaT" if v is None else v.isoformat() for v in values], dtype="datetime64[D]")
+        # savez appends .npz to names without it, so write through an open file
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        return len(columns["name"])
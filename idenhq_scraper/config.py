@@ -2,6 +2,43 @@ class Config:
     # --- Files ---
     SESSION_FILE = "session.json"
     OUTPUT_FILE = "product_data.json"
+    JSONL_OUTPUT_FILE = "product_data.jsonl"  # Append-only stream written during the scrape
+    WRITE_LEGACY_JSON = True  # Convert the JSONL stream into OUTPUT_FILE when the run finishes
+    SINK_BATCH_SIZE = 50  # Max buffered records before a forced flush (pages also flush on completion)
+    CHECKPOINT_FILE = "scrape_checkpoint.json"  # Last completed page, dedup journal offset and output offset for --resume
+    DEDUP_JOURNAL_FILE = "scrape_dedup.journal"  # Append-only card fingerprints, replayed up to the checkpointed offset on --resume
+    WORKER_OUTPUT_PATTERN = "product_data.worker{}.jsonl"  # Per-worker streams merged at the end of a parallel run
+    DELTA_OUTPUT_FILE = "product_data.delta.jsonl"  # Change records written by --delta runs
+    DELTA_INDEX_FILE = "delta_index.json"  # Natural key -> fingerprint of the products as of the last run
+    DELTA_STOP_AFTER_UNCHANGED_PAGES = 3  # Consecutive unchanged pages before a delta scrape stops (0 = never)
+    NATURAL_KEY_FIELDS = ("id", "name", "category")  # Composite product key; the card ID alone is not unique
+    SQLITE_OUTPUT = True  # Mirror every scraped product into an upserting SQLite database
+    SQLITE_OUTPUT_FILE = "product_data.sqlite"
+    COLUMNAR_OUTPUT = "auto"  # "auto" (Parquet via pyarrow, else NumPy .npz), "parquet", "npz" or "off"
+    PARQUET_OUTPUT_FILE = "product_data.parquet"
+    NPZ_OUTPUT_FILE = "product_data.npz"
+    COLUMNAR_ROW_GROUP_SIZE = 10000  # Rows per Parquet row group
+    
+    # --- Debug Artifacts ---
+    DEBUG_ARTIFACT_LEVEL = "on-error"  # "off", "on-error" (screenshots only on failure) or "verbose" (every step)
+    DEBUG_ARTIFACT_DIR = "debug_artifacts"
+    DEBUG_RING_SIZE = 50  # Recent steps kept in memory and written alongside failure screenshots
+    DEBUG_MAX_PENDING_CAPTURES = 4  # Background captures in flight before new verbose snapshots are dropped
+    
+    # --- Browser Profile ---
+    LEAN_BROWSER_PROFILE = True  # Block unused assets, disable animations and shrink the viewport on every context
+    BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+    BLOCKED_URL_PATTERNS = [
+        r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net", r"facebook\.net",
+        r"segment\.(io|com)", r"hotjar\.com", r"sentry\.io", r"mixpanel\.com", r"intercom\.io",
+    ]
+    LEAN_VIEWPORT = {"width": 1024, "height": 720}
+    
+    # --- Metrics ---
+    METRICS_ENABLED = True  # Per-phase timing spans and retry/timeout/fallback counters
+    METRICS_PREFIX = "idenhq_scraper"
+    METRICS_JSON_FILE = "run_metrics.json"
+    METRICS_PROMETHEUS_FILE = "run_metrics.prom"
     
     # --- URLs ---
     BASE_URL = "https://hiring.idenhq.com"
@@ -14,11 +51,39 @@ class Config:
         "password": "EynKbIKc"
     }
     
+    # --- Session Startup ---
+    SESSION_STARTUP_MODE = "race"  # "race": probe the stored session, racing restore vs. login when inconclusive; "sequential": restore then login
+    SESSION_PROBE_TIMEOUT = 5000
+    SESSION_PROBE_MARKER = "Launch Challenge"  # Text only an authenticated instructions page serves
+    
+    # --- Navigation Shortcut ---
+    NAVIGATION_SHORTCUT = True  # Jump straight to the inventory using the state saved after the last full click chain
+    NAV_SHORTCUT_FILE = "nav_shortcut.json"
+    NAV_SHORTCUT_PROBE_TIMEOUT = 5000  # How long the grid gets to appear before falling back to the click chain
+    NAV_SHORTCUT_MAX_MISSES = 2  # Probe misses in a row before the shortcut is marked unusable and no longer tried or re-saved
+    
     # --- Timeouts ---
     DEFAULT_TIMEOUT = 30000  # 30 seconds (in ms)
     LONG_TIMEOUT = 45000     # 45 seconds for potentially slower operations
     SHORT_TIMEOUT = 5000     # 5 seconds for quick checks
     
+    # --- Condition Waits (upper bounds replace the old fixed sleeps) ---
+    DOM_SETTLE_MS = 250             # DOM must be mutation-free this long to count as settled
+    POST_CLICK_SETTLE_TIMEOUT = 1000  # Max wait for the DOM to settle after a click
+    RENDER_SETTLE_TIMEOUT = 2000    # Max wait for the inventory to settle before scraping
+    PAGE_SETTLE_TIMEOUT = 1000      # Max wait for cards to finish rendering on each page
+    SCROLL_LOAD_TIMEOUT = 3000      # Max wait for new cards after scrolling
+    INVENTORY_LOAD_TIMEOUT = 3000   # Max wait for cards to appear after the Inventory click
+    
+    # --- Budgets ---
+    RUN_DEADLINE = None  # Opt-in: seconds a run (or daemon job) may take in total, e.g. 3600; None = unbounded
+    PHASE_BUDGETS = {"session": 180, "navigation": 180, "scrape": None}  # Seconds per phase, always within the run deadline
+    CARD_BUDGET = 15  # Seconds for extracting one card field by field
+    RUN_DEADLINE_TAIL = 120  # Within this many seconds of the deadline, timeouts shrink proportionally
+    MIN_OPERATION_TIMEOUT = 100  # Floor for budgeted timeouts in ms (Playwright treats 0 as no timeout)
+    ABSENT_FIELD_AFTER_MISSES = 3  # Consecutive cards without a field before it is treated as absent on this layout
+    ABSENT_FIELD_TIMEOUT = 200  # Timeout in ms for looking up a field treated as absent
+    
     # --- Selectors ---
     # Login Page
     LOGIN_USERNAME_SELECTOR = 'input[name="username"], input[type="email"], input[placeholder*="email" i]'
@@ -39,4 +104,54 @@ class Config:
     
     # Pagination
     NEXT_PAGE_SELECTOR = "button:has-text('Next'), a:has-text('Next')"
-    PAGINATION_SELECTOR = "nav[aria-label='pagination'], div.pagination"
\ No newline at end of file
+    PAGINATION_SELECTOR = "nav[aria-label='pagination'], div.pagination"
+    PAGE_QUERY_PARAM = "page"  # Query parameter used for direct page seeks when the app keeps page state in the URL
+    SELECTOR_CACHE = True  # Pin the alternative of an OR-selector that matched and try it first next time
+    SELECTOR_CACHE_FILE = "selector_cache.json"
+    SELECTOR_PIN_TIMEOUT = 2000  # How long a pinned alternative gets before the full list is re-evaluated
+    SELECTOR_CACHE_SAVE_INTERVAL = 30  # Seconds between selector cache writes; pending pins are written at exit
+    
+    # --- Parallelism ---
+    WORKER_CONCURRENCY = 1  # Number of pages scraping disjoint page slices in parallel (1 = single page)
+    
+    # --- Pacing ---
+    PACING_ENABLED = True  # Adapt in-flight page loads and request spacing to observed latency and errors (AIMD)
+    PACING_MIN_CONCURRENCY = 1
+    PACING_MAX_CONCURRENCY = 8  # Upper bound on simultaneous page loads across workers/daemon slots
+    PACING_MIN_DELAY = 0.0  # Seconds between request starts when the server is healthy
+    PACING_MAX_DELAY = 5.0
+    PACING_DELAY_STEP = 0.05  # Delay trimmed per healthy request, and the floor of a backoff
+    PACING_DECREASE_FACTOR = 0.5  # Multiplier applied to the concurrency limit on a timeout, error or slowdown
+    PACING_LATENCY_SMOOTHING = 0.2  # Weight of the newest sample in the moving latency average
+    PACING_LATENCY_TOLERANCE = 2.0  # Average latency above baseline * tolerance + slack counts as a slowdown
+    PACING_LATENCY_SLACK = 0.5  # Seconds; keeps fast clicks from tripping on jitter
+    PACING_MIN_COOLDOWN = 1.0  # Minimum seconds between backoffs
+    
+    # --- Daemon ---
+    DAEMON_HOST = "127.0.0.1"
+    DAEMON_PORT = 8787
+    DAEMON_SOCKET = None  # Path to a Unix socket; overrides host/port when set
+    DAEMON_POOL_SIZE = 2  # Warm pages kept parked on the inventory grid
+    DAEMON_HEALTH_INTERVAL = 30  # Seconds between health checks of an idle slot
+    DAEMON_RECYCLE_AFTER_JOBS = 50  # Replace a slot's context after this many jobs to bound renderer memory
+    DAEMON_JOB_OUTPUT_PATTERN = "product_data.job_{}.jsonl"
+    DAEMON_JOBS_DIR = "daemon_jobs"  # Every job's output is written here; a job's "output" may only be a file name
+    DAEMON_ALLOWED_ORIGINS = ()  # Origin headers accepted by the API; browser requests from any other page are refused
+    DAEMON_MAX_FINISHED_JOBS = 500  # Finished jobs kept for GET /jobs; the oldest are dropped beyond this
+    DAEMON_FINISHED_JOB_TTL = 24 * 3600  # Seconds a finished job is kept
+    
+    # --- Record/Replay ---
+    RECORD_DIR = "recordings"  # Where --record saves the HAR and per-page HTML snapshots
+    RECORD_HAR_FILE = "run.har"  # HAR inside RECORD_DIR, replayed with replay.py har
+    RECORD_HTML_SNAPSHOTS = True  # Save page_NNNN.html after each scraped page for browserless re-extraction
+    
+    # --- Extraction ---
+    TYPED_RECORDS = True  # Parse price to cents, weight/rating to floats, size to dimensions and dates to ISO/epoch
+    FOOTER_DATE_ORDER = "DMY"  # Field order of the card footer's "Updated: 14/3/2025" dates
+    BATCH_EXTRACTION = True  # Extract all visible cards with a single page.evaluate round-trip
+    NETWORK_CAPTURE = False  # Read records from the inventory's XHR/fetch JSON, DOM scraping as fallback
+    CAPTURE_URL_PATTERNS = [r"/api/.*(product|inventory|item)", r"(product|inventory|item)s?(\.json|\?|$)"]
+    CAPTURE_WAIT_TIMEOUT = 10000  # Max wait for the next page's payload before falling back to the DOM
+    PRUNE_EXTRACTED_CARDS = False  # Drop committed cards from infinite-scroll views to keep the DOM flat
+    PRUNE_MODE = "hollow"  # "hollow" empties cards but keeps their height; "remove" detaches them
+    PRUNE_KEEP_LAST = 3  # Newest cards left intact as the scroll anchor for the next load
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import uuid
+import signal
+import asyncio
+import argparse
+from playwright.async_api import async_playwright
+
+from config import Config
+from auth import Authenticator
+from sink import JsonlSink
+from workers import ScrapeWorkerPool
+from artifacts import debug_artifacts
+from metrics import metrics
+from pacing import pacing
+from budget import budget
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+                415: "Unsupported Media Type"}
+
+
+class ScrapeDaemon:
+    """Long-running scraper with a pool of warm, authenticated pages parked on the inventory grid.
+
+    Jobs are submitted over a small local HTTP API (TCP or Unix socket) and queued; each warm slot
+    takes jobs one at a time, is health-checked before every job and while idle, and is recycled
+    (new context from the saved session) when a check fails.
+
+        POST /jobs           {"output": "file.jsonl", "start_page": 1, "end_page": null} -> {"id": ...}
+        GET  /jobs           all jobs
+        GET  /jobs/<id>      one job
+        GET  /health         pool and queue status
+
+    The API has no authentication, so it only writes inside DAEMON_JOBS_DIR, takes POST bodies as
+    application/json (which a cross-origin page can't send without a preflight) and refuses requests
+    whose Origin is not in DAEMON_ALLOWED_ORIGINS.
+    """
+
+    def __init__(self, pool_size=None):
+        self.config = Config()
+        self.pool_size = pool_size or self.config.DAEMON_POOL_SIZE
+        self.pool = ScrapeWorkerPool()
+        self.auth = Authenticator()
+        self.queue = asyncio.Queue()
+        self.jobs = {}
+        self.slots = {}
+        self.consumers = []
+        self.browser = None
+        self.server = None
+        self.stopping = asyncio.Event()
+
+    # --- Warm pool ---
+
+    async def storage_state(self, refresh=False):
+        """Returns the saved session, logging in again when it is missing or refresh is requested."""
+        if refresh or not os.path.exists(self.config.SESSION_FILE):
+            context = await self.auth.login(self.browser)
+            if not context:
+                raise Exception("Login failed while refreshing the daemon session")
+            await context.close()
+        with open(self.config.SESSION_FILE, "r") as f:
+            return json.load(f)
+
+    async def open_slot(self, slot_id):
+        """Opens an authenticated page parked on the inventory grid, re-logging in once if the session is stale."""
+        for refresh in (False, True):
+            slot = await self.pool.open_worker(self.browser, await self.storage_state(refresh=refresh), slot_id)
+            if slot:
+                slot["jobs_run"] = 0
+                self.slots[slot_id] = slot
+                return slot
+            print(f"[slot {slot_id}] Could not warm up{' after re-login' if refresh else ''}.")
+        raise Exception(f"Slot {slot_id} could not reach the inventory")
+
+    async def close_slot(self, slot):
+        self.slots.pop(slot["id"], None)
+        try: await slot["context"].close()
+        except Exception as close_err: print(f"[slot {slot['id']}] Error closing context: {close_err}")
+
+    async def is_healthy(self, slot):
+        """Cheap check that the slot's page is alive and still showing product cards."""
+        page = slot["page"]
+        if page.is_closed():
+            return False
+        if slot["jobs_run"] >= self.config.DAEMON_RECYCLE_AFTER_JOBS:
+            print(f"[slot {slot['id']}] Recycling after {slot['jobs_run']} jobs.")
+            return False
+        try:
+            return await page.locator(self.config.PRODUCT_CARD_SELECTOR).count() > 0
+        except Exception as e:
+            print(f"[slot {slot['id']}] Health check failed: {e}")
+            return False
+
+    async def ensure_healthy(self, slot):
+        if await self.is_healthy(slot):
+            return slot
+        metrics.incr("retries", "daemon_slot_recycle")
+        print(f"[slot {slot['id']}] Unhealthy; recycling.")
+        await self.close_slot(slot)
+        return await self.open_slot(slot["id"])
+
+    async def park(self, slot):
+        """Returns a slot to the first inventory page after a job so the next job starts immediately."""
+        scraper = slot["scraper"]
+        # The finished scrape detached network capture; listen again before page 1's payload is requested
+        scraper.start_capture(slot["page"])
+        if not await scraper.goto_page(slot["page"], 1):
+            print(f"[slot {slot['id']}] Could not return to page 1; it will be recycled.")
+            slot["jobs_run"] = self.config.DAEMON_RECYCLE_AFTER_JOBS
+
+    # --- Jobs ---
+
+    def job_output_path(self, name):
+        """Resolves a job's output file name inside DAEMON_JOBS_DIR; paths and parent references are refused."""
+        if not isinstance(name, str) or name in ("", ".", "..") or os.path.isabs(name) or os.path.basename(name) != name or "\\" in name:
+            raise ValueError("output must be a plain file name; jobs are written to DAEMON_JOBS_DIR")
+        os.makedirs(self.config.DAEMON_JOBS_DIR, exist_ok=True)
+        return os.path.join(self.config.DAEMON_JOBS_DIR, name)
+
+    def evict_finished_jobs(self):
+        """Drops finished jobs older than DAEMON_FINISHED_JOB_TTL, then the oldest beyond DAEMON_MAX_FINISHED_JOBS."""
+        cutoff = time.time() - self.config.DAEMON_FINISHED_JOB_TTL
+        finished = [job for job in self.jobs.values() if "finished_at" in job]
+        expired = [job for job in finished if job["finished_at"] < cutoff]
+        kept = [job for job in finished if job["finished_at"] >= cutoff]
+        kept.sort(key=lambda job: job["finished_at"])
+        expired += kept[:max(0, len(kept) - self.config.DAEMON_MAX_FINISHED_JOBS)]
+        for job in expired:
+            del self.jobs[job["id"]]
+
+    def submit(self, options):
+        self.evict_finished_jobs()
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "output": self.job_output_path(options.get("output") or self.config.DAEMON_JOB_OUTPUT_PATTERN.format(job_id)),
+            "start_page": int(options.get("start_page") or 1),
+            "end_page": int(options["end_page"]) if options.get("end_page") else None,
+            "submitted_at": time.time(),
+        }
+        self.jobs[job_id] = job
+        self.queue.put_nowait(job_id)
+        print(f"Queued job {job_id} -> {job['output']}")
+        return job
+
+    async def run_job(self, slot, job):
+        job["status"] = "running"
+        job["slot"] = slot["id"]
+        job["started_at"] = time.time()
+        print(f"[slot {slot['id']}] Running job {job['id']}...")
+        try:
+            with JsonlSink(job["output"], batch_size=self.config.SINK_BATCH_SIZE) as sink:
+                # Every job gets its own run deadline, local to this slot's task
+                budget.start()
+                with metrics.span("daemon.job"):
+                    job["products"] = await slot["scraper"].scrape_product_data(
+                        slot["page"], sink=sink, start_page=job["start_page"], end_page=job["end_page"])
+            outcome = slot["scraper"].outcome
+            job["status"] = "done" if outcome == "completed" else outcome
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"[slot {slot['id']}] Job {job['id']} failed: {e}")
+        finally:
+            budget.clear()
+        job["finished_at"] = time.time()
+        slot["jobs_run"] += 1
+        await self.park(slot)
+
+    async def consume(self, slot_id):
+        """Owns one warm slot: runs queued jobs on it and health-checks it while idle."""
+        slot = self.slots[slot_id]
+        while not self.stopping.is_set():
+            try:
+                job_id = await asyncio.wait_for(self.queue.get(), timeout=self.config.DAEMON_HEALTH_INTERVAL)
+            except asyncio.TimeoutError:
+                try:
+                    slot = await self.ensure_healthy(slot)
+                except Exception as e:
+                    print(f"[slot {slot_id}] Recycle failed: {e}")
+                continue
+            try:
+                slot = await self.ensure_healthy(slot)
+                await self.run_job(slot, self.jobs[job_id])
+            except Exception as e:
+                job = self.jobs[job_id]
+                job.update(status="failed", error=str(e), finished_at=time.time())
+                print(f"[slot {slot_id}] Could not run job {job_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    # --- HTTP API ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length") or 0))
+            method, path, _ = (request_line.split(" ") + ["", "", ""])[:3]
+            status, payload = self.route(method, path, body, headers)
+        except Exception as e:
+            status, payload = 400, {"error": str(e)}
+        data = json.dumps(payload, indent=2).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def route(self, method, path, body, headers):
+        origin = headers.get("origin")
+        if origin and origin not in self.config.DAEMON_ALLOWED_ORIGINS:
+            return 403, {"error": f"origin {origin} is not allowed"}
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            return 200, {
+                "slots": {slot_id: {"jobs_run": slot["jobs_run"], "url": slot["page"].url} for slot_id, slot in self.slots.items()},
+                "queued": self.queue.qsize(),
+                "running": sum(1 for job in self.jobs.values() if job["status"] == "running"),
+                "pacing": pacing.state(),
+            }
+        if path == "/jobs":
+            if method == "POST":
+                if headers.get("content-type", "").split(";", 1)[0].strip().lower() != "application/json":
+                    return 415, {"error": "POST /jobs takes an application/json body"}
+                options = json.loads(body.decode("utf-8") or "{}") if body else {}
+                if not isinstance(options, dict):
+                    return 400, {"error": "the job must be a JSON object"}
+                return 202, self.submit(options)
+            if method == "GET":
+                return 200, list(self.jobs.values())
+            return 405, {"error": "use GET or POST"}
+        if path.startswith("/jobs/"):
+            job = self.jobs.get(path[len("/jobs/"):])
+            return (200, job) if job else (404, {"error": "unknown job"})
+        return 404, {"error": "not found"}
+
+    # --- Lifecycle ---
+
+    async def serve(self, host=None, port=None, socket_path=None):
+        async with async_playwright() as p:
+            self.browser = await p.chromium.launch(headless=True)
+            try:
+                print(f"Warming {self.pool_size} slots...")
+                await asyncio.gather(*(self.open_slot(slot_id) for slot_id in range(self.pool_size)))
+                self.consumers = [asyncio.ensure_future(self.consume(slot_id)) for slot_id in list(self.slots)]
+
+                socket_path = socket_path or self.config.DAEMON_SOCKET
+                if socket_path:
+                    self.server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+                    print(f"Scrape daemon listening on unix:{socket_path}")
+                else:
+                    host, port = host or self.config.DAEMON_HOST, port or self.config.DAEMON_PORT
+                    self.server = await asyncio.start_server(self.handle_connection, host, port)
+                    print(f"Scrape daemon listening on http://{host}:{port}")
+
+                loop = asyncio.get_running_loop()
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    try: loop.add_signal_handler(sig, self.stopping.set)
+                    except NotImplementedError: pass
+                await self.stopping.wait()
+            finally:
+                print("Shutting down scrape daemon...")
+                if self.server:
+                    self.server.close()
+                    await self.server.wait_closed()
+                for consumer in self.consumers:
+                    consumer.cancel()
+                await asyncio.gather(*self.consumers, return_exceptions=True)
+                for slot in list(self.slots.values()):
+                    await self.close_slot(slot)
+                await debug_artifacts.drain()
+                await self.browser.close()
+                metrics.export()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IdenhQ scrape daemon with a warm browser pool")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--pool-size", type=int)
+    args = parser.parse_args()
+    asyncio.run(ScrapeDaemon(args.pool_size).serve(args.host, args.port, args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+
+
+def card_fingerprint(card_text):
+    """Fingerprint of a card's full rendered text, whitespace-normalized so re-renders hash identically."""
+    normalized = " ".join((card_text or "").split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def record_fingerprint(record):
+    """Fingerprint of an extracted product record's full content, independent of key order."""
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class DedupIndex:
+    """Set of content fingerprints with O(1) membership.
+
+    With a journal open, new fingerprints are also appended to an append-only file, one per line, and
+    commit() makes them durable and returns the file offset to store in a checkpoint. Checkpoints then
+    stay constant-size instead of carrying the whole set.
+    """
+
+    def __init__(self, fingerprints=None):
+        self.fingerprints = set(fingerprints or ())
+        self.journal = None
+        self.pending = []
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprint):
+        """Adds fingerprint; returns False if it was already present."""
+        if fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        if self.journal is not None:
+            self.pending.append(fingerprint)
+        return True
+
+    def load_state(self, fingerprints):
+        self.fingerprints = set(fingerprints or ())
+        if self.journal is not None:
+            self.pending = sorted(self.fingerprints)
+
+    def load_journal(self, path, offset):
+        """Replaces the set with the fingerprints in the first offset bytes of a journal."""
+        self.fingerprints = set()
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            self.fingerprints.update(line.strip() for line in f.read(offset).splitlines() if line.strip())
+
+    def open_journal(self, path, offset=None):
+        """Starts journaling to path, truncated to offset (a resumed run) or emptied (a fresh one)."""
+        self.close_journal()
+        self.journal = open(path, "a+" if offset else "w", encoding="utf-8")
+        if offset:
+            self.journal.truncate(offset)
+        self.pending = []
+
+    def commit(self):
+        """Appends fingerprints added since the last commit, fsyncs, and returns the journal offset."""
+        if self.journal is None:
+            return None
+        if self.pending:
+            self.journal.write("".join(f"{fingerprint}\n" for fingerprint in self.pending))
+            self.pending = []
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        return self.journal.tell()
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.pending = []
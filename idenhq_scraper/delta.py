@@ -0,0 +1,92 @@
+import os
+import json
+
+from config import Config
+from dedup import record_fingerprint
+from sink import iter_jsonl
+
+
+def record_key(record, key_fields=None):
+    """Natural key of a product from NATURAL_KEY_FIELDS (ID, name and category; the ID alone is not unique)."""
+    key_fields = key_fields or Config.NATURAL_KEY_FIELDS
+    return "|".join(str(record.get(field, "")) for field in key_fields)
+
+
+class DeltaTracker:
+    """Compares a re-scrape against the previous run's key -> fingerprint index and emits only the differences.
+
+    Change records look like {"change": "added"|"changed", "key": ..., "record": {...}} and
+    {"change": "removed", "key": ...}. Removals are only known after a crawl that reached the end.
+    """
+
+    def __init__(self, index_path=None, baseline_path=None):
+        self.config = Config()
+        self.index_path = index_path or self.config.DELTA_INDEX_FILE
+        self.baseline_path = baseline_path or self.config.JSONL_OUTPUT_FILE
+        self.index = {}  # key -> record fingerprint
+        self.seen = set()
+        self.page_changes = 0
+        self.unchanged_pages = 0
+        self.counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        self.full_crawl = False
+
+    def load(self):
+        """Loads the saved index, rebuilding it from the last full output when that is newer (or no index exists)."""
+        index_mtime = os.path.getmtime(self.index_path) if os.path.exists(self.index_path) else None
+        baseline_mtime = os.path.getmtime(self.baseline_path) if os.path.exists(self.baseline_path) else None
+        if index_mtime is not None and (baseline_mtime is None or index_mtime >= baseline_mtime):
+            try:
+                with open(self.index_path, "r") as f:
+                    self.index = json.load(f)
+                print(f"Loaded delta index of {len(self.index)} products from {self.index_path}.")
+                return len(self.index)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not read delta index {self.index_path}: {e}")
+        if baseline_mtime is not None:
+            self.index = {record_key(record): record_fingerprint(record) for record in iter_jsonl(self.baseline_path)}
+            print(f"Built delta index of {len(self.index)} products from {self.baseline_path}.")
+        else:
+            print("No previous output found; every product will be reported as added.")
+        return len(self.index)
+
+    def classify(self, record):
+        """Returns the change record for record, or None if it is unchanged since the previous run."""
+        key = record_key(record)
+        fingerprint = record_fingerprint(record)
+        self.seen.add(key)
+        previous = self.index.get(key)
+        if previous == fingerprint:
+            self.counts["unchanged"] += 1
+            return None
+        change = "added" if previous is None else "changed"
+        self.index[key] = fingerprint
+        self.counts[change] += 1
+        self.page_changes += 1
+        return {"change": change, "key": key, "record": record}
+
+    def finish_page(self):
+        """Closes out a page and returns how many consecutive pages have had no changes."""
+        self.unchanged_pages = 0 if self.page_changes else self.unchanged_pages + 1
+        self.page_changes = 0
+        return self.unchanged_pages
+
+    def should_stop(self):
+        limit = self.config.DELTA_STOP_AFTER_UNCHANGED_PAGES
+        return bool(limit) and self.unchanged_pages >= limit
+
+    def removals(self):
+        """Change records for indexed products not seen in a crawl that reached the last page."""
+        self.full_crawl = True
+        removed = [key for key in self.index if key not in self.seen]
+        for key in removed:
+            del self.index[key]
+        self.counts["removed"] += len(removed)
+        return [{"change": "removed", "key": key} for key in removed]
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+        print(f"Delta: {self.counts['added']} added, {self.counts['changed']} changed, {self.counts['removed']} removed, "
+              f"{self.counts['unchanged']} unchanged{'' if self.full_crawl else ' (stopped early; removals not checked)'}.")
@@ -0,0 +1,301 @@
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from config import Config
+
+ADJECTIVES = ["Smart", "Modern", "Deluxe", "Premium", "Classic", "Ultra", "Compact", "Eco"]
+NOUNS = ["Solution", "System", "Device", "Set", "Kit", "Tool", "Gear", "Pack"]
+CATEGORIES = ["Sports", "Garden", "Beauty", "Electronics", "Toys", "Books", "Home", "Clothing"]
+COLORS = ["Silver", "Purple", "Brown", "Gray", "Orange", "Black", "White", "Red"]
+WARRANTIES = ["None", "90 Days", "1 Year", "18 Months", "2 Years"]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{body}</body></html>"""
+
+LOGIN_BODY = """
+<form method="post" action="/login" class="space-y-4">
+  <input name="username" type="email" placeholder="Email">
+  <input name="password" type="password" placeholder="Password">
+  <button type="submit">Login</button>
+</form>"""
+
+INSTRUCTIONS_BODY = """
+<h1>Instructions</h1>
+<button onclick="location.href='/challenge'">Launch Challenge</button>"""
+
+# Client-rendered challenge flow and inventory grid. Card markup matches what ProductScraper targets.
+CHALLENGE_BODY = """
+<div id="app"></div>
+<script>
+const MODE = "__MODE__";
+const app = document.getElementById("app");
+const params = new URLSearchParams(location.search);
+let currentPage = 1;
+let totalPages = 1;
+let loading = false;
+
+function step(label, next) {
+  app.innerHTML = "";
+  const button = document.createElement("button");
+  button.textContent = label;
+  button.onclick = () => setTimeout(next, 50);
+  app.appendChild(button);
+}
+
+function escapeHtml(value) {
+  return String(value).replace(/[&<>"]/g, (c) => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+}
+
+function row(label, value) {
+  return `<div class="flex items-center justify-between"><dt class="text-muted-foreground">${label}:</dt><dd class="font-medium">${value}</dd></div>`;
+}
+
+function cardHtml(p) {
+  const stars = "&#9733;".repeat(Math.round(p.rating));
+  return `<div class="rounded-lg border bg-card text-card-foreground shadow-sm">
+    <div class="flex flex-col space-y-1.5 p-6">
+      <h3 class="text-lg font-semibold">${escapeHtml(p.name)}</h3>
+      <p class="text-xs text-muted-foreground font-mono">ID: ${p.id}</p>
+      <div class="inline-flex items-center rounded-full border px-2.5 py-0.5 text-xs bg-primary text-primary-foreground">${p.category}</div>
+    </div>
+    <div class="p-6 pt-0"><dl class="space-y-2">
+      ${row("Color", p.color)}
+      ${row("Weight (kg)", p.weight_kg)}
+      ${row("Warranty", p.warranty)}
+      ${row("Rating", `<span>${stars}</span><span class="ml-1 text-sm text-muted-foreground">${p.rating.toFixed(1)}</span>`)}
+      ${row("Price", "$" + p.price.toFixed(2))}
+      ${row("Size", p.size)}
+      ${row("Last Updated", p.last_updated)}
+    </dl></div>
+    <div class="flex items-center p-6 pt-2 border-t"><span class="text-xs text-muted-foreground">Updated: ${p.footer_last_updated}</span></div>
+  </div>`;
+}
+
+async function fetchPage(n) {
+  const response = await fetch(`/api/products?page=${n}`);
+  return response.json();
+}
+
+function renderPagination(nav) {
+  nav.innerHTML = "";
+  const add = (label, target, current) => {
+    const button = document.createElement("button");
+    button.textContent = label;
+    if (current) button.setAttribute("aria-current", "page");
+    button.onclick = () => showPage(target);
+    nav.appendChild(button);
+  };
+  if (currentPage > 1) add("Previous", currentPage - 1);
+  const first = Math.max(1, currentPage - 2);
+  const last = Math.min(totalPages, currentPage + 2);
+  for (let n = first; n <= last; n++) add(String(n), n, n === currentPage);
+  if (last < totalPages) add(String(totalPages), totalPages);
+  if (currentPage < totalPages) add("Next", currentPage + 1);
+}
+
+async function showPage(n) {
+  const data = await fetchPage(n);
+  currentPage = data.page;
+  totalPages = data.total_pages;
+  document.getElementById("grid").innerHTML = data.items.map(cardHtml).join("");
+  history.replaceState(null, "", `/challenge?view=inventory&page=${currentPage}`);
+  renderPagination(document.getElementById("pagination"));
+}
+
+async function loadMore() {
+  if (loading || currentPage >= totalPages) return;
+  loading = true;
+  const data = await fetchPage(currentPage + 1);
+  currentPage = data.page;
+  document.getElementById("grid").insertAdjacentHTML("beforeend", data.items.map(cardHtml).join(""));
+  loading = false;
+}
+
+async function showInventory() {
+  app.innerHTML = `<div class="space-y-6"><div id="grid" class="grid gap-4"></div>
+    ${MODE === "pagination" ? '<nav aria-label="pagination" id="pagination"></nav>' : ""}</div>`;
+  if (MODE === "pagination") {
+    await showPage(parseInt(params.get("page") || "1", 10));
+  } else {
+    const data = await fetchPage(1);
+    totalPages = data.total_pages;
+    document.getElementById("grid").innerHTML = data.items.map(cardHtml).join("");
+    history.replaceState(null, "", "/challenge?view=inventory");
+    window.addEventListener("scroll", () => {
+      if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) loadMore();
+    });
+  }
+}
+
+if (params.get("view") === "inventory") {
+  showInventory();
+} else {
+  step("Start Journey", () => step("Continue Search", () => step("Inventory Section", showInventory)));
+}
+</script>"""
+
+
+def generate_products(count, seed=7):
+    """Deterministic product list shaped like the live inventory."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        day, month = rng.randint(1, 28), rng.randint(1, 6)
+        products.append({
+            "name": f"{rng.choice(ADJECTIVES)} {category} {rng.choice(NOUNS)}",
+            "id": i,
+            "category": category,
+            "color": rng.choice(COLORS),
+            "weight_kg": round(rng.uniform(0.2, 15), 2),
+            "warranty": rng.choice(WARRANTIES),
+            "rating": round(rng.uniform(1, 5), 1),
+            "price": round(rng.uniform(5, 999), 2),
+            "size": f"{rng.randint(5, 50)}×{rng.randint(5, 50)}×{rng.randint(5, 50)} cm",
+            "last_updated": f"2025-{month:02d}-{day:02d}",
+            "footer_last_updated": f"{day}/{month}/2025",
+        })
+    return products
+
+
+class FixtureServer:
+    """Local stand-in for hiring.idenhq.com: login, /instructions -> /challenge flow and an inventory grid.
+
+    mode is "pagination" (numbered buttons, Next, ?page= URL state) or "scroll" (infinite scroll).
+    latency_ms delays every API response to mimic a slow backend.
+    """
+
+    def __init__(self, product_count=200, page_size=20, mode="pagination", latency_ms=0, host="127.0.0.1", port=0):
+        self.config = Config()
+        self.products = generate_products(product_count)
+        self.page_size = page_size
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.sessions = set()
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Fixture server running at {self.url} ({len(self.products)} products, {self.mode}, {self.latency_ms}ms latency).")
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def products_page(self, page_num):
+        total_pages = max(1, -(-len(self.products) // self.page_size))
+        page_num = min(max(1, page_num), total_pages)
+        start = (page_num - 1) * self.page_size
+        return {
+            "page": page_num,
+            "total_pages": total_pages,
+            "total": len(self.products),
+            "items": self.products[start:start + self.page_size],
+        }
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def authenticated(self):
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == "session" and value in server.sessions:
+                        return True
+                return False
+
+            def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def redirect(self, location, headers=None):
+                self.send_response(302)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+
+            def page(self, title, body):
+                self.send_body(200, PAGE_TEMPLATE.format(title=title, body=body))
+
+            def do_GET(self):
+                parts = urlparse(self.path)
+                if parts.path == "/":
+                    if self.authenticated():
+                        return self.redirect(server.config.INSTRUCTIONS_URL_PART)
+                    return self.page("Login", LOGIN_BODY)
+                if not self.authenticated():
+                    if parts.path.startswith("/api/"):
+                        return self.send_body(401, json.dumps({"error": "unauthorized"}), "application/json")
+                    return self.redirect("/")
+                if parts.path == server.config.INSTRUCTIONS_URL_PART:
+                    return self.page("Instructions", INSTRUCTIONS_BODY)
+                if parts.path == server.config.CHALLENGE_URL_PART:
+                    return self.page("Challenge", CHALLENGE_BODY.replace("__MODE__", server.mode))
+                if parts.path == "/api/products":
+                    if server.latency_ms:
+                        time.sleep(server.latency_ms / 1000)
+                    page_num = int((parse_qs(parts.query).get("page") or ["1"])[0])
+                    return self.send_body(200, json.dumps(server.products_page(page_num)), "application/json")
+                self.send_body(404, "Not found", "text/plain")
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/login":
+                    return self.send_body(404, "Not found", "text/plain")
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                username = (form.get("username") or [""])[0]
+                password = (form.get("password") or [""])[0]
+                if (username, password) != (server.config.CREDENTIALS["username"], server.config.CREDENTIALS["password"]):
+                    return self.redirect("/")
+                token = secrets.token_hex(16)
+                server.sessions.add(token)
+                self.redirect(server.config.INSTRUCTIONS_URL_PART, {"Set-Cookie": f"session={token}; Path=/; HttpOnly"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the IdenhQ challenge site")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--mode", choices=["pagination", "scroll"], default="pagination")
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = FixtureServer(args.products, args.page_size, args.mode, args.latency_ms, port=args.port)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
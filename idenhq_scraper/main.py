@@ -1,24 +1,93 @@
 import os
-import json
 import asyncio
+import argparse
 import time
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
 from config import Config
 from navigator import Navigator
 from scraper import ProductScraper
 from auth import Authenticator # Import AuthManager from its module
+from sink import JsonlSink, TeeSink, truncate_jsonl
+from sqlite_sink import SqliteSink
+from checkpoint import ScrapeCheckpoint
+from artifacts import debug_artifacts
+from metrics import metrics
+from workers import ScrapeWorkerPool
+from columnar import ColumnarWriter
+from delta import DeltaTracker
+from replay import HtmlRecorder
+from budget import budget
 
-async def main():
+def open_sink(config, path=None, append=False):
+    """JSONL sink for the run, mirrored into the SQLite database when SQLITE_OUTPUT is enabled."""
+    sink = JsonlSink(path or config.JSONL_OUTPUT_FILE, batch_size=config.SINK_BATCH_SIZE, append=append)
+    if config.SQLITE_OUTPUT:
+        return TeeSink(sink, SqliteSink(batch_size=config.SINK_BATCH_SIZE, mode="resume" if append else "full"))
+    return sink
+
+
+def save_output(config, sink, products_written):
+    """Reports the streamed output and converts it to the legacy JSON and columnar files if configured."""
+    if products_written:
+        print(f"\nStreamed {products_written} products to {config.JSONL_OUTPUT_FILE}.")
+        if config.WRITE_LEGACY_JSON:
+            print(f"Writing legacy output to {config.OUTPUT_FILE}...")
+            sink.finalize(config.OUTPUT_FILE)
+        else:
+            sink.close()
+        ColumnarWriter().write(sink.path)
+        print("Data saved successfully.")
+    else:
+        print("\nNo product data was scraped.")
+
+
+def warn_deadline_stop(resumable):
+    """Tells the user a RUN_DEADLINE stop left the output incomplete and how to finish it."""
+    print(f"\nWARNING: RUN_DEADLINE ({Config.RUN_DEADLINE}s) ran out before the last page; the output is incomplete.")
+    if resumable:
+        print("Run `python main.py --resume` to continue from the checkpoint.")
+    else:
+        print("Parallel runs keep no checkpoint; re-run with a larger RUN_DEADLINE (or None) to scrape every page.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="IdenhQ product scraper")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted scrape from its checkpoint instead of starting over")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only emit products added, changed or removed since the previous run, stopping early on unchanged pages")
+    parser.add_argument("--columnar", choices=["auto", "parquet", "npz", "off"],
+                        help="Columnar export next to the JSON output (default: Config.COLUMNAR_OUTPUT)")
+    parser.add_argument("--record", action="store_true",
+                        help="Record the run's traffic as a HAR (and per-page HTML) for offline re-extraction with replay.py")
+    return parser.parse_args()
+
+
+async def main(resume=False, delta=False, record=False):
     """Main execution function for the IdenhQ scraper."""
     start_time = time.time()
     config = Config()
+    checkpoint = ScrapeCheckpoint()
+    budget.start()
+    
+    if delta and resume:
+        print("--delta re-scrapes from the first page; ignoring --resume.")
+        resume = False
+    resume_from = checkpoint.load() if resume else None
+    if resume and not resume_from:
+        print("No usable checkpoint found. Starting a fresh scrape.")
+    elif resume_from and resume_from.get("completed"):
+        print(f"Checkpointed scrape already completed ({resume_from['products_written']} products). Nothing to resume.")
+        if config.WRITE_LEGACY_JSON:
+            JsonlSink(resume_from["output_file"], append=True).finalize(config.OUTPUT_FILE)
+        ColumnarWriter().write(resume_from["output_file"])
+        return
+    if not resume_from and not delta:
+        checkpoint.clear()
     
-    # Clear old screenshots
-    print("Clearing old debug screenshots...")
-    for f in os.listdir("."):
-        if f.startswith("debug_") and f.endswith(".png"):
-            try: os.remove(f)
-            except OSError: pass
+    # Clear old debug artifacts
+    print("Clearing old debug artifacts...")
+    debug_artifacts.clear()
 
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)  # Set headless=False for debugging
@@ -32,54 +101,104 @@ async def main():
             navigator = Navigator()
             scraper = ProductScraper()
             
-            # Try loading session first
-            context = await auth_manager.load_session(browser)
-
-            if not context:
-                print("Could not load valid session, attempting new login.")
-                context = await auth_manager.login(browser)
+            # Probe the stored session, then restore it, log in, or race both; session.restore and
+            # session.login are timed inside, session.establish is the total
+            with metrics.span("session.establish"), budget.phase("session"):
+                context = await auth_manager.establish_session(browser)
 
             if not context:
                 print("Failed to establish a session. Exiting.")
                 return
 
             print("Successfully obtained context.")
+
+            if record:
+                # The HAR is written when the context closes; recorded runs use a single page so one HAR covers them
+                os.makedirs(config.RECORD_DIR, exist_ok=True)
+                har_path = os.path.join(config.RECORD_DIR, config.RECORD_HAR_FILE)
+                await context.route_from_har(har_path, update=True)
+                if config.RECORD_HTML_SNAPSHOTS:
+                    scraper.recorder = HtmlRecorder(config.RECORD_DIR)
+                print(f"Recording this run to {har_path}.")
+
+            if config.WORKER_CONCURRENCY > 1 and not resume_from and not delta and not record:
+                # Each worker opens its own context from the saved session and scrapes a slice of pages
+                sink = open_sink(config)
+                pool = ScrapeWorkerPool()
+                outcome = "failed"
+                try:
+                    with metrics.span("scrape.total"), budget.phase("scrape"):
+                        products_written = await pool.run(browser, sink)
+                    outcome = pool.outcome
+                finally:
+                    sink.close(outcome)
+                save_output(config, sink, products_written)
+                if outcome == "deadline":
+                    warn_deadline_stop(resumable=False)
+                return
+
             # Use the first page if available, otherwise create new
             if context.pages:
                 page = context.pages[0]
                 print("Reusing existing page from context.")
-                if config.INSTRUCTIONS_URL_PART not in page.url and config.CHALLENGE_URL_PART not in page.url:
+                if record or (config.INSTRUCTIONS_URL_PART not in page.url and config.CHALLENGE_URL_PART not in page.url):
                     print(f"Page is on unexpected URL: {page.url}. Navigating to instructions page.")
                     try:
-                        await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=config.LONG_TIMEOUT)
+                        await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=budget.timeout(config.LONG_TIMEOUT))
                     except Exception as nav_err:
                         print(f"Failed to navigate reused page to instructions: {nav_err}")
                         print("Closing potentially bad reused page and creating a new one.")
                         await page.close()
                         page = await context.new_page()
-                        await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=config.LONG_TIMEOUT)
+                        await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=budget.timeout(config.LONG_TIMEOUT))
             else:
                 print("No existing page in context, creating new page.")
                 page = await context.new_page()
-                await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=config.LONG_TIMEOUT)
+                await page.goto(config.BASE_URL + config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=budget.timeout(config.LONG_TIMEOUT))
 
             print(f"Page ready at URL: {page.url}\n")
 
             # Set a longer default timeout for this complex scrape
-            page.set_default_timeout(60000)  # 60 seconds
+            page.set_default_timeout(budget.timeout(60000))  # 60 seconds, less when the run deadline is closer
+
+            # Listen for the inventory's data requests before they are triggered
+            scraper.start_capture(page)
 
             # Navigate through the challenge
-            if await navigator.navigate_challenge_flow(page):
-                # Scrape data if navigation succeeded
-                product_data = await scraper.scrape_product_data(page)
-
-                if product_data:
-                    print(f"\nSaving {len(product_data)} products to {config.OUTPUT_FILE}...")
-                    with open(config.OUTPUT_FILE, 'w') as f:
-                        json.dump(product_data, f, indent=2)
-                    print("Data saved successfully.")
+            with metrics.span("navigation.total"), budget.phase("navigation"):
+                navigated = await navigator.navigate_challenge_flow(page)
+            if navigated and delta:
+                # Compare against the previous run and write only the differences
+                tracker = DeltaTracker()
+                tracker.load()
+                sink = JsonlSink(config.DELTA_OUTPUT_FILE, batch_size=config.SINK_BATCH_SIZE)
+                try:
+                    with metrics.span("scrape.total"), budget.phase("scrape"):
+                        changes_written = await scraper.scrape_product_data(page, sink=sink, delta=tracker)
+                finally:
+                    sink.close()
+                tracker.save()
+                print(f"Wrote {changes_written} change records to {config.DELTA_OUTPUT_FILE}.")
+            elif navigated:
+                # Scrape data if navigation succeeded, streaming records to the JSONL sink
+                if resume_from:
+                    # Drop anything written after the last checkpointed page, then keep appending
+                    truncate_jsonl(resume_from["output_file"], resume_from["output_offset"])
+                    sink = open_sink(config, resume_from["output_file"], append=True)
                 else:
-                    print("\nNo product data was scraped.")
+                    sink = open_sink(config)
+                outcome = "failed"
+                try:
+                    with metrics.span("scrape.total"), budget.phase("scrape"):
+                        products_written = await scraper.scrape_product_data(page, sink=sink, checkpoint=checkpoint, resume_from=resume_from)
+                    outcome = scraper.outcome
+                finally:
+                    # The SQLite mirror records how the run ended (completed, partial, deadline or failed)
+                    sink.close(outcome)
+
+                save_output(config, sink, products_written)
+                if outcome == "deadline":
+                    warn_deadline_stop(resumable=True)
             else:
                 print("\n--- Challenge Navigation Flow Failed ---")
                 print("Review debug screenshots and console output.")
@@ -88,8 +207,9 @@ async def main():
             print(f"\n--- An error occurred in the main execution block ---")
             print(f"Error: {e}")
             if page and not page.is_closed():
-                await page.screenshot(path="debug_main_exception.png")
+                await debug_artifacts.capture_failure(page, "main_exception")
         finally:
+            await debug_artifacts.drain()
             print("\nClosing browser...")
             if page and not page.is_closed():
                 try: await page.close()
@@ -100,10 +220,15 @@ async def main():
             if browser:
                 try: await browser.close()
                 except Exception as browser_close_err: print(f"Error closing browser: {browser_close_err}")
+            metrics.record("run.total", time.time() - start_time)
+            metrics.export()
 
     end_time = time.time()
     print(f"Total execution time: {end_time - start_time:.2f} seconds")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.columnar:
+        Config.COLUMNAR_OUTPUT = args.columnar
+    asyncio.run(main(resume=args.resume, delta=args.delta, record=args.record))
\ No newline at end of file
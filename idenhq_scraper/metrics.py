@@ -0,0 +1,129 @@
+import os
+import json
+import time
+
+from config import Config
+
+
+class Span:
+    """Times a block with perf_counter and records it under name when it exits."""
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    """Shared no-op span handed out when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Metrics:
+    """Per-phase timing spans and event counters, exported as a JSON summary and a Prometheus textfile."""
+
+    def __init__(self):
+        self.config = Config()
+        self.enabled = self.config.METRICS_ENABLED
+        self.spans = {}  # name -> [count, total_seconds, min_seconds, max_seconds]
+        self.counters = {}  # (kind, reason) -> count
+
+    def span(self, name):
+        """Context manager timing a phase, e.g. `with metrics.span("navigation.start_journey"):`."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        stats = self.spans.get(name)
+        if stats is None:
+            self.spans[name] = [1, seconds, seconds, seconds]
+            return
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = min(stats[2], seconds)
+        stats[3] = max(stats[3], seconds)
+
+    def incr(self, kind, reason="", amount=1):
+        """Counts an event such as incr("timeouts", "wait_for_element") or incr("fallbacks", "next_to_scroll")."""
+        if not self.enabled:
+            return
+        key = (kind, reason)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def summary(self):
+        spans = {
+            name: {
+                "count": count,
+                "total_s": round(total, 6),
+                "mean_s": round(total / count, 6),
+                "min_s": round(low, 6),
+                "max_s": round(high, 6),
+            }
+            for name, (count, total, low, high) in sorted(self.spans.items())
+        }
+        counters = {}
+        for (kind, reason), count in sorted(self.counters.items()):
+            counters.setdefault(kind, {})[reason or "total"] = count
+        return {"spans": spans, "counters": counters}
+
+    def prometheus_text(self):
+        prefix = self.config.METRICS_PREFIX
+        lines = [
+            f"# HELP {prefix}_span_seconds Time spent in each scrape phase.",
+            f"# TYPE {prefix}_span_seconds summary",
+        ]
+        for name, (count, total, low, high) in sorted(self.spans.items()):
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {count}')
+        lines.append(f"# HELP {prefix}_span_max_seconds Slowest occurrence of each scrape phase.")
+        lines.append(f"# TYPE {prefix}_span_max_seconds gauge")
+        for name, (count, total, low, high) in sorted(self.spans.items()):
+            lines.append(f'{prefix}_span_max_seconds{{span="{name}"}} {high:.6f}')
+        for kind in sorted({kind for kind, _ in self.counters}):
+            lines.append(f"# HELP {prefix}_{kind}_total Count of {kind} during the run.")
+            lines.append(f"# TYPE {prefix}_{kind}_total counter")
+            for (counter_kind, reason), count in sorted(self.counters.items()):
+                if counter_kind == kind:
+                    lines.append(f'{prefix}_{kind}_total{{reason="{reason}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prometheus_path=None):
+        """Writes the JSON summary and Prometheus textfile (atomically, for the node-exporter textfile collector)."""
+        if not self.enabled:
+            return
+        json_path = json_path or self.config.METRICS_JSON_FILE
+        prometheus_path = prometheus_path or self.config.METRICS_PROMETHEUS_FILE
+        for path, content in ((json_path, json.dumps(self.summary(), indent=2)), (prometheus_path, self.prometheus_text())):
+            if not path:
+                continue
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        print(f"Metrics exported to {json_path} and {prometheus_path}.")
+
+
+metrics = Metrics()
@@ -1,21 +1,144 @@
-import asyncio
+import os
+import json
+import time
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
 
 from auth import Authenticator
 from config import Config
+from waits import PageWaiter
+from artifacts import debug_artifacts
+from metrics import metrics
+from budget import budget
+
+SHORTCUT_RESTORED_FLAG = "__idenhq_scraper_shortcut_restored"
+
+# Snapshot of the app state reached after the click chain
+CAPTURE_APP_STATE_SCRIPT = """(flag) => {
+    const dump = (storage) => {
+        const entries = {};
+        for (let i = 0; i < storage.length; i++) {
+            const key = storage.key(i);
+            if (key !== flag) entries[key] = storage.getItem(key);
+        }
+        return entries;
+    };
+    return {
+        url: location.href,
+        local_storage: dump(localStorage),
+        session_storage: dump(sessionStorage),
+        history_state: history.state,
+    };
+}"""
+
+# Init script restoring that state once per tab, before the app's own scripts read it; it only acts on the
+# shortcut URL itself, so a fallback to the click chain runs against the app's own state
+RESTORE_APP_STATE_SCRIPT = """(shortcut) => {
+    if (location.href !== shortcut.url || sessionStorage.getItem(shortcut.flag)) return;
+    for (const [key, value] of Object.entries(shortcut.local_storage || {})) localStorage.setItem(key, value);
+    for (const [key, value] of Object.entries(shortcut.session_storage || {})) sessionStorage.setItem(key, value);
+    if (shortcut.history_state !== null && shortcut.history_state !== undefined) history.replaceState(shortcut.history_state, "", location.href);
+    sessionStorage.setItem(shortcut.flag, "1");
+}"""
 
 class Navigator:
     def __init__(self):  # Remove the config parameter
         self.config = Config()  # Create config internally like Authenticator does
         self.auth = Authenticator()
+        self.waiter = PageWaiter()
     
     
     async def navigate_challenge_flow(self, page):
+        """Lands on the inventory grid, via the saved shortcut when it works and the full click chain otherwise."""
+        if self.config.NAVIGATION_SHORTCUT:
+            with metrics.span("navigation.shortcut"):
+                if await self.try_shortcut(page):
+                    return True
+        if not await self.walk_challenge_flow(page):
+            return False
+        if self.config.NAVIGATION_SHORTCUT:
+            await self.save_shortcut(page)
+        return True
+    
+    def load_shortcut(self):
+        """Returns the saved shortcut, or None when there is none or it can't be read."""
+        if not os.path.exists(self.config.NAV_SHORTCUT_FILE):
+            return None
+        try:
+            with open(self.config.NAV_SHORTCUT_FILE, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Could not read navigation shortcut: {e}")
+            return None
+    
+    def write_shortcut(self, shortcut, page):
+        tmp_path = f"{self.config.NAV_SHORTCUT_FILE}.{os.getpid()}.{id(page)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(shortcut, f, indent=2)
+        os.replace(tmp_path, self.config.NAV_SHORTCUT_FILE)
+    
+    async def save_shortcut(self, page):
+        """Records the URL, web storage and history state of the inventory view for later runs.
+        
+        A shortcut marked unusable is kept as is, so an app that can't deep-link isn't probed again every run.
+        """
+        previous = self.load_shortcut() or {}
+        if previous.get("disabled"):
+            return
+        try:
+            shortcut = await page.evaluate(CAPTURE_APP_STATE_SCRIPT, SHORTCUT_RESTORED_FLAG)
+            shortcut["saved_at"] = time.time()
+            shortcut["misses"] = previous.get("misses", 0)
+            self.write_shortcut(shortcut, page)
+            print(f"Navigation shortcut saved to {self.config.NAV_SHORTCUT_FILE} ({shortcut['url']}).")
+        except Exception as e:
+            print(f"Could not save navigation shortcut: {e}")
+    
+    def record_shortcut_result(self, shortcut, page, hit):
+        """Counts consecutive probe misses and marks the shortcut unusable after NAV_SHORTCUT_MAX_MISSES."""
+        misses = 0 if hit else shortcut.get("misses", 0) + 1
+        if misses == shortcut.get("misses", 0):
+            return
+        shortcut["misses"] = misses
+        if misses >= self.config.NAV_SHORTCUT_MAX_MISSES:
+            shortcut["disabled"] = True
+            print(f"Navigation shortcut missed {misses} times in a row; no longer using it (delete {self.config.NAV_SHORTCUT_FILE} to try again).")
+        try:
+            self.write_shortcut(shortcut, page)
+        except Exception as e:
+            print(f"Could not update navigation shortcut: {e}")
+    
+    async def try_shortcut(self, page):
+        """Restores the saved app state and jumps to the inventory URL; False if the grid doesn't show within the probe window."""
+        shortcut = self.load_shortcut()
+        if not shortcut or shortcut.get("disabled"):
+            return False
+        try:
+            print(f"Trying navigation shortcut to {shortcut['url']}...")
+            await page.add_init_script(script=f"({RESTORE_APP_STATE_SCRIPT})({json.dumps(dict(shortcut, flag=SHORTCUT_RESTORED_FLAG))})")
+            await page.goto(shortcut["url"], wait_until="domcontentloaded", timeout=budget.timeout(self.config.LONG_TIMEOUT))
+            await page.locator(self.config.PRODUCT_CARD_SELECTOR).first.wait_for(state="visible", timeout=self.config.NAV_SHORTCUT_PROBE_TIMEOUT)
+            print("Navigation shortcut landed on the inventory grid.")
+            metrics.incr("shortcut", "hit")
+            self.record_shortcut_result(shortcut, page, hit=True)
+            debug_artifacts.snapshot(page, "shortcut_product_grid")
+            return True
+        except Exception as e:
+            print(f"Navigation shortcut failed ({e}); falling back to the full click chain.")
+            metrics.incr("fallbacks", "shortcut_to_click_chain")
+            self.record_shortcut_result(shortcut, page, hit=False)
+            try:
+                await page.goto(self.config.BASE_URL + self.config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=budget.timeout(self.config.LONG_TIMEOUT))
+            except Exception as nav_err:
+                print(f"Could not return to the instructions page: {nav_err}")
+            return False
+    
+    async def walk_challenge_flow(self, page):
         """Handles sequence: Launch -> Start Journey -> Continue Search -> Inventory Button -> Verify Grid."""
         try:
             current_url = page.url
             print(f"--- Starting Challenge Navigation Flow ---")
             print(f"Starting challenge navigation flow from: {current_url}")
+            launch_started = time.perf_counter()
             
             # --- Step 1: Launch Challenge (if on Instructions page) ---
             if self.config.INSTRUCTIONS_URL_PART in current_url:
@@ -23,14 +146,14 @@ class Navigator:
                 if not await self.auth.click_element(page, self.config.LAUNCH_CHALLENGE_SELECTOR, "Launch Challenge"):
                     return False
                 try:
-                    await page.wait_for_url(f"**{self.config.CHALLENGE_URL_PART}", timeout=self.config.LONG_TIMEOUT)
+                    await page.wait_for_url(f"**{self.config.CHALLENGE_URL_PART}", timeout=budget.timeout(self.config.LONG_TIMEOUT))
                     print(f"Navigated successfully to URL containing '{self.config.CHALLENGE_URL_PART}'.")
                 except PlaywrightTimeoutError:
                     print(f"Warning: Navigation to '{self.config.CHALLENGE_URL_PART}' URL timed out after launch. Checking current URL and elements.")
                     if self.config.CHALLENGE_URL_PART not in page.url:
                         print(f"Still not on challenge URL. Current URL: {page.url}")
                         if not await self.auth.wait_for_element_robust(page, self.config.START_JOURNEY_SELECTOR):
-                            await page.screenshot(path="debug_failed_navigate_post_launch.png")
+                            await debug_artifacts.capture_failure(page, "failed_navigate_post_launch")
                             print("Error: Could not find Start Journey button after Launch Challenge timeout and wrong URL.")
                             return False
                         else:
@@ -46,7 +169,7 @@ class Navigator:
                     if not await self.auth.click_element(page, self.config.LAUNCH_CHALLENGE_SELECTOR, "Launch Challenge"): 
                         return False
                     try:
-                        await page.wait_for_url(f"**{self.config.CHALLENGE_URL_PART}", timeout=self.config.LONG_TIMEOUT)
+                        await page.wait_for_url(f"**{self.config.CHALLENGE_URL_PART}", timeout=budget.timeout(self.config.LONG_TIMEOUT))
                         print(f"Navigated successfully to URL containing '{self.config.CHALLENGE_URL_PART}'.")
                     except PlaywrightTimeoutError:
                         print("Warning: Navigation timeout after launching from unexpected page. Checking elements.")
@@ -56,7 +179,7 @@ class Navigator:
                             print("Found Start Journey button despite nav timeout.")
                 else:
                     print(f"Error: Not on expected page ({self.config.INSTRUCTIONS_URL_PART} or {self.config.CHALLENGE_URL_PART}) and Launch button not found. Current URL: {page.url}")
-                    await page.screenshot(path="debug_wrong_page_start_challenge_flow.png")
+                    await debug_artifacts.capture_failure(page, "wrong_page_start_challenge_flow")
                     return False
             
             # --- Verify we are now on the Challenge Page ---
@@ -65,51 +188,58 @@ class Navigator:
                     await page.wait_for_url(f"**{self.config.CHALLENGE_URL_PART}", timeout=self.config.SHORT_TIMEOUT)
                 except PlaywrightTimeoutError:
                     print(f"Error: Failed to confirm navigation to challenge page. Current URL: {page.url}")
-                    await page.screenshot(path="debug_not_on_challenge_page_final.png")
+                    await debug_artifacts.capture_failure(page, "not_on_challenge_page_final")
                     return False
             print(f"Confirmed on challenge page: {page.url}")
+            metrics.record("navigation.launch_challenge", time.perf_counter() - launch_started)
             
             # --- Step 2: Click Start Journey ---
-            if not await self.auth.wait_for_element_robust(page, self.config.START_JOURNEY_SELECTOR): 
-                return False
-            if not await self.auth.click_element(page, self.config.START_JOURNEY_SELECTOR, "Start Journey"): 
-                return False
+            with metrics.span("navigation.start_journey"):
+                if not await self.auth.wait_for_element_robust(page, self.config.START_JOURNEY_SELECTOR): 
+                    return False
+                if not await self.auth.click_element(page, self.config.START_JOURNEY_SELECTOR, "Start Journey"): 
+                    return False
             
             # --- Step 3: Click Continue Search ---
-            if not await self.auth.wait_for_element_robust(page, self.config.CONTINUE_SEARCH_SELECTOR): 
-                return False
-            if not await self.auth.click_element(page, self.config.CONTINUE_SEARCH_SELECTOR, "Continue Search"): 
-                return False
+            with metrics.span("navigation.continue_search"):
+                if not await self.auth.wait_for_element_robust(page, self.config.CONTINUE_SEARCH_SELECTOR): 
+                    return False
+                if not await self.auth.click_element(page, self.config.CONTINUE_SEARCH_SELECTOR, "Continue Search"): 
+                    return False
             
             # --- Step 4: Click Inventory Section Button ---
-            print("Waiting for the 'Inventory Section' button...")
-            if not await self.auth.wait_for_element_robust(page, self.config.INVENTORY_BUTTON_SELECTOR):
-                await page.screenshot(path="debug_failed_find_inventory_button.png")
-                return False
-            if not await self.auth.click_element(page, self.config.INVENTORY_BUTTON_SELECTOR, "Inventory Section Button"):
-                return False
-            
-            # Add a wait to ensure page loads completely
-            await asyncio.sleep(3.0)
+            with metrics.span("navigation.inventory_section"):
+                print("Waiting for the 'Inventory Section' button...")
+                if not await self.auth.wait_for_element_robust(page, self.config.INVENTORY_BUTTON_SELECTOR):
+                    await debug_artifacts.capture_failure(page, "failed_find_inventory_button")
+                    return False
+                if not await self.auth.click_element(page, self.config.INVENTORY_BUTTON_SELECTOR, "Inventory Section Button"):
+                    return False
             
-            # --- Step 5: Wait for Product Cards to be visible ---
-            # First wait for the page to be stable
-            await page.wait_for_load_state('networkidle', timeout=self.config.LONG_TIMEOUT)
+            # Wait for the first product cards to be attached (bounded by the old fixed delay)
+            with metrics.span("navigation.inventory_load"):
+                await self.waiter.wait_for_card_count_change(page, self.config.PRODUCT_CARD_SELECTOR, 0, timeout=self.config.INVENTORY_LOAD_TIMEOUT)
+                
+                # --- Step 5: Wait for Product Cards to be visible ---
+                # First wait for the page to be stable
+                await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.LONG_TIMEOUT))
             
-            # Take a screenshot of the current state for debugging
-            await page.screenshot(path="debug_after_inventory_click.png")
+            # Record the current state for debugging
+            debug_artifacts.snapshot(page, "after_inventory_click")
             
             # Wait for any product cards to be visible
             print(f"Waiting for product cards to be visible using selector: {self.config.PRODUCT_CARD_SELECTOR}")
             try:
                 card_locator = page.locator(self.config.PRODUCT_CARD_SELECTOR).first
-                await card_locator.wait_for(state="visible", timeout=self.config.LONG_TIMEOUT)
+                with metrics.span("navigation.product_grid"):
+                    await card_locator.wait_for(state="visible", timeout=budget.timeout(self.config.LONG_TIMEOUT))
                 print("Product card is visible!")
-                await page.screenshot(path="debug_product_card_visible.png")
+                debug_artifacts.snapshot(page, "product_card_visible")
                 return True
             except PlaywrightTimeoutError:
+                metrics.incr("timeouts", "product_grid")
                 print("Failed to find any product cards.")
-                await page.screenshot(path="debug_no_product_cards.png")
+                await debug_artifacts.capture_failure(page, "no_product_cards")
                 return False
         
         except PlaywrightError as e:
@@ -119,7 +249,7 @@ class Navigator:
                 print(f"A Playwright error occurred during the challenge navigation flow: {e}")
             try:
                 if page and not page.is_closed():
-                    await page.screenshot(path="debug_challenge_flow_playwright_error.png")
+                    await debug_artifacts.capture_failure(page, "challenge_flow_playwright_error")
             except Exception: 
                 pass
             return False
@@ -127,7 +257,7 @@ class Navigator:
             print(f"An unexpected error occurred during the challenge navigation flow: {e}")
             try:
                 if page and not page.is_closed():
-                    await page.screenshot(path="debug_challenge_flow_unexpected_error.png")
+                    await debug_artifacts.capture_failure(page, "challenge_flow_unexpected_error")
             except Exception: 
                 pass
             return False
\ No newline at end of file
@@ -0,0 +1,178 @@
+import time
+import asyncio
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from config import Config
+from metrics import metrics
+
+BASELINE_DRIFT = 0.02  # How fast a kind's baseline latency follows a lasting change in its average
+
+
+class PacedRequest:
+    """Holds one in-flight slot for a page load or click and reports its latency and outcome on exit."""
+
+    __slots__ = ("controller", "kind", "start", "skipped")
+
+    def __init__(self, controller, kind):
+        self.controller = controller
+        self.kind = kind
+        self.start = 0.0
+        self.skipped = False
+
+    def skip(self):
+        """Releases the slot without feeding this request to the controller (e.g. a wait that ended for other reasons)."""
+        self.skipped = True
+
+    async def __aenter__(self):
+        await self.controller.acquire()
+        self.start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.skipped:
+            outcome = None
+        elif exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, PlaywrightTimeoutError):
+            outcome = "timeout"
+        elif issubclass(exc_type, Exception):
+            outcome = "error"
+        else:
+            outcome = None  # Cancelled: says nothing about the server
+        await self.controller.release(self.kind, elapsed, outcome)
+        return False
+
+
+class NullPacedRequest:
+    """Shared no-op request handed out when pacing is disabled."""
+
+    __slots__ = ()
+
+    def skip(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_PACED_REQUEST = NullPacedRequest()
+
+
+class PacingController:
+    """AIMD control of in-flight page loads and the gap between request starts.
+
+    Every paced request is timed per kind ("next_page", "seek", "scroll", "click"). A timeout, an error,
+    or an average latency well above that kind's baseline halves the concurrency limit and doubles the
+    pacing delay (at most once per cooldown); each other success adds 1/limit to the limit and trims the
+    delay by PACING_DELAY_STEP, all within the PACING_* bounds. The limit is shared by every page in the
+    process (workers, daemon slots), so it caps how many of them load at once.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.enabled = self.config.PACING_ENABLED
+        self.min_limit = max(1, self.config.PACING_MIN_CONCURRENCY)
+        self.max_limit = max(self.min_limit, self.config.PACING_MAX_CONCURRENCY)
+        self.limit = float(self.min_limit)
+        self.delay = self.config.PACING_MIN_DELAY
+        self.in_flight = 0
+        self.next_start = 0.0
+        self.latency = {}  # kind -> moving average of successful latencies (seconds)
+        self.baselines = {}  # kind -> low-water latency the average is compared against
+        self.last_decrease = 0.0
+        self.condition = None
+        self.loop = None
+
+    def request(self, kind):
+        """Async context manager pacing one request, e.g. `async with pacing.request("next_page"):`."""
+        if not self.enabled:
+            return NULL_PACED_REQUEST
+        return PacedRequest(self, kind)
+
+    def get_condition(self):
+        # asyncio primitives belong to one event loop; benchmark and replay runs start fresh loops
+        loop = asyncio.get_running_loop()
+        if self.condition is None or self.loop is not loop:
+            self.condition = asyncio.Condition()
+            self.loop = loop
+            self.in_flight = 0
+        return self.condition
+
+    async def acquire(self):
+        """Waits for a free slot under the current limit, then for this request's turn in the pacing schedule."""
+        condition = self.get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        now = time.monotonic()
+        start_at = max(now, self.next_start)
+        self.next_start = start_at + self.delay
+        if start_at > now:
+            try:
+                await asyncio.sleep(start_at - now)
+            except BaseException:
+                # Cancelled before __aenter__ returned, so __aexit__ will never give the slot back
+                async with condition:
+                    self.in_flight = max(0, self.in_flight - 1)
+                    condition.notify_all()
+                raise
+
+    async def release(self, kind, seconds, outcome):
+        condition = self.get_condition()
+        async with condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if outcome is not None:
+                self.observe(kind, seconds, outcome)
+            condition.notify_all()
+
+    def observe(self, kind, seconds, outcome):
+        """Feeds one request's latency and outcome ("ok", "timeout" or "error") into the controller."""
+        metrics.record(f"pacing.{kind}", seconds)
+        if outcome != "ok":
+            metrics.incr("pacing_signals", f"{kind}_{outcome}")
+            self.decrease(kind, outcome)
+            return
+        average = self.latency.get(kind, seconds)
+        average += self.config.PACING_LATENCY_SMOOTHING * (seconds - average)
+        self.latency[kind] = average
+        baseline = self.baselines.get(kind, seconds)
+        self.baselines[kind] = min(seconds, baseline + BASELINE_DRIFT * (average - baseline))
+        if average > self.baselines[kind] * self.config.PACING_LATENCY_TOLERANCE + self.config.PACING_LATENCY_SLACK:
+            metrics.incr("pacing_signals", f"{kind}_slow")
+            self.decrease(kind, "slow")
+        else:
+            self.increase()
+
+    def increase(self):
+        previous = int(self.limit)
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self.delay = max(self.config.PACING_MIN_DELAY, self.delay - self.config.PACING_DELAY_STEP)
+        if int(self.limit) > previous:
+            print(f"Pacing: raised concurrency to {int(self.limit)} (delay {self.delay:.2f}s).")
+
+    def decrease(self, kind, reason):
+        # One backoff per cooldown, so a burst of failures from the same congestion only counts once
+        now = time.monotonic()
+        cooldown = max(self.config.PACING_MIN_COOLDOWN, self.latency.get(kind, 0.0))
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.config.PACING_DECREASE_FACTOR)
+        self.delay = min(self.config.PACING_MAX_DELAY, max(self.delay * 2, self.config.PACING_DELAY_STEP))
+        metrics.incr("pacing", "backoff")
+        print(f"Pacing: {kind} {reason}; concurrency {int(self.limit)}, delay {self.delay:.2f}s.")
+
+    def state(self):
+        return {
+            "concurrency": int(self.limit),
+            "in_flight": self.in_flight,
+            "delay": round(self.delay, 3),
+            "latency": {kind: round(seconds, 3) for kind, seconds in self.latency.items()},
+        }
+
+
+pacing = PacingController()
@@ -0,0 +1,136 @@
+import re
+import calendar
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from config import Config
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:[.,]\d+)*")
+SIZE_UNIT_PATTERN = re.compile(r"([a-zA-Z]+)\s*$")
+
+
+def first_number(text):
+    """First number in text as written (e.g. "4.7" from "★★★★ 4.7"), or None."""
+    match = NUMBER_PATTERN.search(str(text or ""))
+    return match.group(0) if match else None
+
+
+def parse_float(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    number = first_number(value)
+    try:
+        return float(number.replace(",", "")) if number else None
+    except ValueError:
+        return None
+
+
+def parse_rating(value):
+    """Rating as a float; accepts "4.7", "★★★★ 4.7" or a number from the API."""
+    return parse_float(value)
+
+
+def parse_price_cents(value):
+    """Price as integer cents ("$1,234.50" -> 123450), computed with Decimal to avoid float rounding."""
+    if isinstance(value, (int, float)):
+        value = repr(value)
+    number = first_number(value)
+    if not number:
+        return None
+    try:
+        return int((Decimal(number.replace(",", "")) * 100).to_integral_value())
+    except InvalidOperation:
+        return None
+
+
+def parse_size(value):
+    """Splits "45×6×6 cm" into ([45.0, 6.0, 6.0], "cm"); (None, None) if it isn't three dimensions."""
+    text = str(value or "")
+    numbers = [float(n.replace(",", "")) for n in NUMBER_PATTERN.findall(text)]
+    if len(numbers) != 3:
+        return None, None
+    unit = SIZE_UNIT_PATTERN.search(text)
+    return numbers, unit.group(1) if unit else None
+
+
+def parse_date(value, order="YMD"):
+    """Parses ISO dates ("2025-03-14") or slash/dot-separated dates in the given field order ("14/3/2025" with "DMY")."""
+    text = str(value or "").strip()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        pass
+    parts = re.split(r"[/.\-]", text)
+    if len(parts) != 3 or not all(part.strip().isdigit() for part in parts):
+        return None
+    fields = dict(zip(order.upper(), (int(part) for part in parts)))
+    try:
+        return date(fields["Y"], fields["M"], fields["D"])
+    except (KeyError, ValueError):
+        return None
+
+
+def date_epoch(day):
+    return calendar.timegm(day.timetuple()) if day else None
+
+
+class ProductRecord:
+    """Normalized product: numeric fields parsed once at extraction, unknown labels kept as raw strings in extra."""
+
+    __slots__ = ("name", "id", "category", "color", "warranty", "weight_kg", "rating", "price_cents",
+                 "size", "size_unit", "last_updated", "footer_last_updated", "extra")
+
+    # Raw keys this record parses; anything else lands in extra unchanged
+    KNOWN_KEYS = ("name", "id", "category", "color", "warranty", "weight_kg", "rating", "price",
+                  "size", "last_updated", "footer_last_updated")
+
+    @classmethod
+    def from_raw(cls, raw, footer_date_order=None):
+        footer_date_order = footer_date_order or Config.FOOTER_DATE_ORDER
+        record = cls()
+        record.name = raw.get("name")
+        record.id = raw.get("id")
+        record.category = raw.get("category")
+        record.color = raw.get("color")
+        record.warranty = raw.get("warranty")
+        record.weight_kg = parse_float(raw.get("weight_kg"))
+        record.rating = parse_rating(raw.get("rating"))
+        record.price_cents = parse_price_cents(raw.get("price"))
+        record.size, record.size_unit = parse_size(raw.get("size"))
+        record.last_updated = parse_date(raw.get("last_updated"))
+        record.footer_last_updated = parse_date(raw.get("footer_last_updated"), footer_date_order)
+        record.extra = {key: value for key, value in raw.items() if key not in cls.KNOWN_KEYS}
+        # Keep the original text of anything present that failed to parse
+        for key, parsed in (("weight_kg", record.weight_kg), ("rating", record.rating), ("price", record.price_cents),
+                            ("size", record.size), ("last_updated", record.last_updated),
+                            ("footer_last_updated", record.footer_last_updated)):
+            if parsed is None and raw.get(key) not in (None, ""):
+                record.extra[f"{key}_raw"] = raw[key]
+        return record
+
+    def to_dict(self):
+        record = {
+            "name": self.name,
+            "id": self.id,
+            "category": self.category,
+            "color": self.color,
+            "warranty": self.warranty,
+            "weight_kg": self.weight_kg,
+            "rating": self.rating,
+            "price_cents": self.price_cents,
+            "size": self.size,
+            "size_unit": self.size_unit,
+            "last_updated": self.last_updated.isoformat() if self.last_updated else None,
+            "last_updated_epoch": date_epoch(self.last_updated),
+            "footer_last_updated": self.footer_last_updated.isoformat() if self.footer_last_updated else None,
+            "footer_last_updated_epoch": date_epoch(self.footer_last_updated),
+        }
+        record.update(self.extra)
+        return record
+
+
+def normalize_record(raw):
+    """Pipeline stage after extraction: typed dict when TYPED_RECORDS is enabled, the raw record otherwise."""
+    if not Config.TYPED_RECORDS:
+        return raw
+    return ProductRecord.from_raw(raw).to_dict()
@@ -0,0 +1,216 @@
+import os
+import glob
+import time
+import asyncio
+import argparse
+from html.parser import HTMLParser
+from playwright.async_api import async_playwright
+
+from config import Config
+from navigator import Navigator
+from scraper import ProductScraper
+from sink import JsonlSink
+from dedup import DedupIndex, card_fingerprint
+from records import first_number, normalize_record
+from browser_profile import browser_profile
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+
+class HtmlRecorder:
+    """Saves the rendered inventory HTML after each scraped page (set as ProductScraper.recorder)."""
+
+    def __init__(self, directory=None):
+        self.config = Config()
+        self.directory = directory or self.config.RECORD_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    async def save_page(self, page, page_num):
+        try:
+            path = os.path.join(self.directory, f"page_{page_num:04d}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(await page.content())
+        except Exception as e:
+            print(f"Non-critical: Could not record HTML for page {page_num}: {e}")
+
+
+# --- Offline extraction ---
+
+class Node:
+    __slots__ = ("tag", "attrs", "classes", "parent", "children")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = set((attrs.get("class") or "").split())
+        self.parent = parent
+        self.children = []  # Nodes and text strings in document order
+
+    def text(self):
+        """textContent: every descendant text node, concatenated."""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+    def descendants(self):
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Node):
+                yield node
+                stack.extend(reversed(node.children))
+
+    def find(self, tag, classes=()):
+        """First descendant matching tag.class1.class2 (querySelector)."""
+        for node in self.descendants():
+            if node.tag == tag and node.classes.issuperset(classes):
+                return node
+        return None
+
+
+class TreeBuilder(HTMLParser):
+    """Minimal DOM tree for saved snapshots, tolerant of unclosed tags."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or "" for name, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, {name: value or "" for name, value in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_simple_selector(selector):
+    """Splits "div.a.b" into ("div", {"a", "b"})."""
+    tag, *classes = selector.strip().split(".")
+    return tag or "div", set(classes)
+
+
+def text(node):
+    return node.text().strip() if node else ""
+
+
+def extract_card(card):
+    """Offline mirror of CARD_EXTRACTION_SCRIPT / extract_card_fields for one parsed card."""
+    info = {}
+    name = card.find("h3")
+    info["name"] = text(name) if name else "Unknown"
+    card_id = card.find("p", {"text-xs", "text-muted-foreground", "font-mono"})
+    info["id"] = text(card_id).replace("ID:", "").strip() if card_id else "Unknown"
+    category = next((node for node in card.descendants() if node.tag == "div"
+                     and "rounded-full" in node.attrs.get("class", "") and "bg-primary" in node.attrs.get("class", "")), None)
+    info["category"] = text(category) if category else "Unknown"
+
+    rows = [node for node in card.descendants() if node.tag == "div" and node.parent.tag == "dl"
+            and node.classes.issuperset({"flex", "items-center", "justify-between"})]
+    for row in rows:
+        label_el = row.find("dt", {"text-muted-foreground"})
+        value_el = row.find("dd", {"font-medium"})
+        if not label_el or not value_el:
+            break
+        label = text(label_el).replace(":", "")
+        value = text(value_el)
+        if label == "Rating":
+            rating_span = value_el.find("span", {"ml-1", "text-sm", "text-muted-foreground"})
+            value = text(rating_span) if rating_span else (first_number(value) or value)
+        if label:
+            info[label.lower().replace(" ", "_").replace("(", "").replace(")", "")] = value
+
+    footer = next((node for node in card.descendants() if node.tag == "span" and node.parent.tag == "div"
+                   and node.parent.classes.issuperset({"items-center", "p-6", "pt-2", "border-t"})), None)
+    if footer:
+        footer_text = text(footer)
+        if footer_text.startswith("Updated:"):
+            info["footer_last_updated"] = footer_text.replace("Updated:", "").strip()
+    return info
+
+
+def parse_cards(html, card_selector=None):
+    """Yields (card text, record) for every live product card in an HTML snapshot."""
+    tag, classes = parse_simple_selector(card_selector or Config.PRODUCT_CARD_SELECTOR)
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    for node in builder.root.descendants():
+        if node.tag == tag and node.classes.issuperset(classes) and "data-scraper-pruned" not in node.attrs:
+            yield node.text(), extract_card(node)
+
+
+def replay_html(directory, sink):
+    """Re-extracts every recorded page snapshot without a browser. Returns the number of products written."""
+    dedup = DedupIndex()
+    started = time.perf_counter()
+    paths = sorted(glob.glob(os.path.join(directory, "page_*.html")))
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        records = []
+        for card_text, record in parse_cards(html):
+            if dedup.add(card_fingerprint(card_text)):
+                records.append(normalize_record(record))
+        sink.write_batch(records)
+    print(f"Re-extracted {sink.count} products from {len(paths)} snapshots in {time.perf_counter() - started:.2f}s.")
+    return sink.count
+
+
+async def replay_har(har_path, sink, headless=True):
+    """Re-runs navigation and scraping in a browser with every request served from a recorded HAR."""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            context = await browser_profile.new_context(browser)
+            await context.route_from_har(har_path, not_found="abort")
+            page = await context.new_page()
+            scraper = ProductScraper()
+            scraper.start_capture(page)
+            started = time.perf_counter()
+            await page.goto(Config.BASE_URL + Config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded")
+            if not await Navigator().navigate_challenge_flow(page):
+                print("Replayed navigation failed; the HAR may not cover the challenge flow.")
+                return 0
+            written = await scraper.scrape_product_data(page, sink=sink)
+            print(f"Replayed {written} products from {har_path} in {time.perf_counter() - started:.2f}s.")
+            return written
+        finally:
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract products from a recorded run (python main.py --record)")
+    parser.add_argument("mode", choices=["html", "har"], help="html: parse saved snapshots without a browser; har: replay the HAR through routing")
+    parser.add_argument("--recording", default=Config.RECORD_DIR, help="Recording directory")
+    parser.add_argument("--output", default="product_data.replay.jsonl")
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+    with JsonlSink(args.output, batch_size=Config.SINK_BATCH_SIZE) as sink:
+        if args.mode == "html":
+            replay_html(args.recording, sink)
+        else:
+            asyncio.run(replay_har(os.path.join(args.recording, Config.RECORD_HAR_FILE), sink, headless=not args.headed))
+    print(f"Output written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
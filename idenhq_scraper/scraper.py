@@ -1,12 +1,136 @@
-import asyncio
 import json
+import re
+import time
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 from config import Config
+from waits import PageWaiter
+from capture import NetworkCapture
+from artifacts import debug_artifacts
+from metrics import metrics
+from selector_cache import selector_resolver
+from pacing import pacing
+from budget import budget
+from dedup import DedupIndex, card_fingerprint, record_fingerprint
+from records import first_number, normalize_record
+
+# Mirrors the per-field locator logic in ProductScraper.extract_card_fields so both
+# extraction modes produce identical records, but runs in a single page.evaluate call.
+CARD_EXTRACTION_SCRIPT = """
+([selector, indices]) => {
+    const text = (el) => (el && el.textContent ? el.textContent : "").trim();
+    const cards = Array.from(document.querySelectorAll(selector));
+    const targets = indices ? indices.map((i) => cards[i]).filter(Boolean) : cards;
+    return targets.map((card) => {
+        const info = {};
+
+        const name = card.querySelector("h3");
+        info.name = name ? text(name) : "Unknown";
+
+        const id = card.querySelector("p.text-xs.text-muted-foreground.font-mono");
+        info.id = id ? text(id).split("ID:").join("").trim() : "Unknown";
+
+        const category = card.querySelector("div[class*='rounded-full'][class*='bg-primary']");
+        info.category = category ? text(category) : "Unknown";
+
+        const rows = card.querySelectorAll(":scope dl > div.flex.items-center.justify-between");
+        for (const row of rows) {
+            const labelEl = row.querySelector("dt.text-muted-foreground");
+            const valueEl = row.querySelector("dd.font-medium");
+            if (!labelEl || !valueEl) {
+                break;
+            }
+            const label = text(labelEl).replace(/:/g, "");
+            let value = text(valueEl);
+
+            if (label === "Rating") {
+                const ratingSpan = valueEl.querySelector("span.ml-1.text-sm.text-muted-foreground");
+                if (ratingSpan) {
+                    value = text(ratingSpan);
+                } else {
+                    // Same pattern as records.NUMBER_PATTERN
+                    const match = value.match(/-?\d+(?:[.,]\d+)*/);
+                    if (match) {
+                        value = match[0];
+                    }
+                }
+            }
+
+            if (label) {
+                const key = label.toLowerCase().split(" ").join("_").replace(/[()]/g, "");
+                info[key] = value;
+            }
+        }
+
+        const footer = card.querySelector(":scope div.items-center.p-6.pt-2.border-t > span");
+        if (footer) {
+            const footerText = text(footer);
+            if (footerText.startsWith("Updated:")) {
+                info.footer_last_updated = footerText.replace("Updated:", "").trim();
+            }
+        }
+        return info;
+    });
+}
+"""
+
+# Drops extracted cards from the DOM except the last few, which stay as the infinite-scroll anchor.
+# "hollow" keeps each card's outer element at its measured height (scroll geometry and framework-owned
+# nodes survive); "remove" detaches the card elements entirely.
+PRUNE_CARDS_SCRIPT = """
+([selector, keepLast, mode]) => {
+    const cards = Array.from(document.querySelectorAll(selector));
+    const victims = cards.slice(0, Math.max(0, cards.length - keepLast));
+    if (mode === "remove") {
+        victims.forEach((card) => card.remove());
+        return victims.length;
+    }
+    const heights = victims.map((card) => card.offsetHeight);
+    victims.forEach((card, i) => {
+        card.style.height = heights[i] + "px";
+        card.style.visibility = "hidden";
+        card.setAttribute("data-scraper-pruned", "");
+        card.replaceChildren();
+    });
+    return victims.length;
+}
+"""
+
+
 class ProductScraper:
     def __init__(self):  # Make sure this doesn't take any parameters
         self.config = Config()
+        self.waiter = PageWaiter()
+        self.capture = NetworkCapture()
+        self.dedup = DedupIndex()
+        self.recorder = None  # Optional replay.HtmlRecorder, saves each page's HTML before it is yielded
+        self.outcome = None  # How the last scrape_product_data ended: "completed", "partial", "deadline" or "failed"
         
+    @property
+    def live_card_selector(self):
+        """Card selector that ignores cards hollowed out by DOM pruning."""
+        return f"{self.config.PRODUCT_CARD_SELECTOR}:not([data-scraper-pruned])"
+    
+    async def prune_extracted_cards(self, page):
+        """Removes already-committed cards from an infinite-scroll view. Returns how many were pruned."""
+        try:
+            pruned = await page.evaluate(PRUNE_CARDS_SCRIPT, [self.live_card_selector, self.config.PRUNE_KEEP_LAST, self.config.PRUNE_MODE])
+            print(f"Pruned {pruned} extracted cards from the DOM ({self.config.PRUNE_MODE}).")
+            return pruned
+        except Exception as e:
+            print(f"Non-critical: Could not prune extracted cards: {e}")
+            return 0
+    
+    def start_capture(self, page):
+        """Attaches network capture to page. Call before navigating to the inventory so its first payload is seen."""
+        if self.config.NETWORK_CAPTURE:
+            self.capture.attach(page)
+    
+    def stop_capture(self):
+        """Removes the response listener once a scrape is done (a daemon slot re-attaches before its next job)."""
+        self.capture.detach()
+    
     async def scroll_to_load_more(self, page):
         """Scrolls to the bottom of the page to trigger loading more items."""
         print("Scrolling to load more items...")
@@ -14,16 +138,20 @@ class ProductScraper:
             # Get count before scrolling
             before_count = await page.locator(self.config.PRODUCT_CARD_SELECTOR).count()
             
-            # Execute scroll to bottom
-            await page.evaluate("""
-                window.scrollTo({
-                    top: document.body.scrollHeight,
-                    behavior: 'smooth'
-                });
-            """)
-            
-            # Wait for potential new content to load
-            await asyncio.sleep(3)
+            async with pacing.request("scroll") as paced:
+                # Execute scroll to bottom (instantly under the lean profile, which disables animations)
+                await page.evaluate("""
+                    (behavior) => window.scrollTo({
+                        top: document.body.scrollHeight,
+                        behavior: behavior
+                    });
+                """, "instant" if self.config.LEAN_BROWSER_PROFILE else "smooth")
+                
+                # Wait until new cards are attached (or the scroll timeout elapses)
+                with metrics.span("scrape.scroll_wait"):
+                    loaded = await self.waiter.wait_for_card_count_change(page, self.config.PRODUCT_CARD_SELECTOR, before_count, timeout=self.config.SCROLL_LOAD_TIMEOUT)
+                if not loaded:
+                    paced.skip()  # Usually the end of the list rather than a slow server
             
             # Check if more items loaded
             after_count = await page.locator(self.config.PRODUCT_CARD_SELECTOR).count()
@@ -35,209 +163,614 @@ class ProductScraper:
             print(f"Error during scroll operation: {e}")
             return False
     
-    async def scrape_product_data(self, page):
-        """Scrapes data from product cards on the inventory page with pagination or infinite scroll handling."""
-        products_data = []
-        print("\n--- Starting Scraping ---")
+    async def extract_cards_batch(self, page, indices=None):
+        """Extracts the product cards in the current view (or only those at indices) with a single page.evaluate call."""
         try:
-            # Wait for the page to stabilize
-            await page.wait_for_load_state('networkidle', timeout=self.config.DEFAULT_TIMEOUT)
-            await asyncio.sleep(2)  # Give extra time for any JavaScript to execute
+            records = await page.evaluate(CARD_EXTRACTION_SCRIPT, [self.live_card_selector, indices])
+            print(f"Batch-extracted {len(records)} cards in one round-trip.")
+            return records
+        except Exception as e:
+            metrics.incr("fallbacks", "batch_to_per_field")
+            print(f"Batch extraction failed: {e}")
+            return None
+    
+    async def extract_card_fields(self, card):
+        """Extracts a single product card field by field using Playwright locators, within the per-card budget."""
+        with budget.card():
+            product_info = {}
+        
+            # Try to scroll the card into view
+            try:
+                await card.scroll_into_view_if_needed(timeout=budget.timeout(self.config.SHORT_TIMEOUT))
+            except Exception as scroll_err:
+                print(f"Non-critical: Couldn't scroll card into view: {scroll_err}")
+        
+            # Extract Name (h3)
+            try:
+                product_info["name"] = (await card.locator("h3").first.text_content(timeout=budget.field_timeout("name", self.config.SHORT_TIMEOUT)) or "").strip()
+                budget.field_seen("name", True)
+            except Exception as e:
+                budget.field_seen("name", False)
+                print(f"Error extracting name: {e}")
+                product_info["name"] = "Unknown"
+        
+            # Extract ID (p.text-muted-foreground.font-mono)
+            try:
+                id_text = (await card.locator("p.text-xs.text-muted-foreground.font-mono").first.text_content(timeout=budget.field_timeout("id", self.config.SHORT_TIMEOUT)) or "").strip()
+                product_info["id"] = id_text.replace("ID:", "").strip()
+                budget.field_seen("id", True)
+            except Exception as e:
+                budget.field_seen("id", False)
+                print(f"Error extracting ID: {e}")
+                product_info["id"] = "Unknown"
+        
+            # Extract Category (div.rounded-full...)
+            try:
+                product_info["category"] = (await card.locator("div[class*='rounded-full'][class*='bg-primary']").first.text_content(timeout=budget.field_timeout("category", self.config.SHORT_TIMEOUT)) or "").strip()
+                budget.field_seen("category", True)
+            except Exception as e:
+                budget.field_seen("category", False)
+                print(f"Error extracting category: {e}")
+                product_info["category"] = "Unknown"
+        
+            # Extract details from Definition List (dl > div > dt/dd)
+            try:
+                details_rows = card.locator("dl > div.flex.items-center.justify-between")
+                details_count = await details_rows.count()
             
-            # Take a screenshot of the initial state
-            await page.screenshot(path="debug_scrape_initial_state.png")
+                for j in range(details_count):
+                    row = details_rows.nth(j)
+                    label_loc = row.locator("dt.text-muted-foreground")
+                    value_loc = row.locator("dd.font-medium")
+                
+                    label = (await label_loc.first.text_content(timeout=budget.timeout(self.config.SHORT_TIMEOUT)) or "").strip().replace(':', '')
+                    value = (await value_loc.first.text_content(timeout=budget.timeout(self.config.SHORT_TIMEOUT)) or "").strip()
+                
+                    # Special handling for Rating (nested span)
+                    if label == "Rating":
+                        # Try to find the rating directly
+                        rating_span = value_loc.locator("span.ml-1.text-sm.text-muted-foreground")
+                        if await rating_span.count() > 0:
+                            value = (await rating_span.first.text_content(timeout=budget.timeout(self.config.SHORT_TIMEOUT)) or "").strip()
+                        # If rating not found in span, keep just the number from the text
+                        else:
+                            value = first_number(value) or value
+                
+                    if label:  # Only add if label is found
+                        key = label.lower().replace(' ', '_').replace('(', '').replace(')', '')
+                        product_info[key] = value
+            except Exception as details_err:
+                print(f"Error extracting details: {details_err}")
+        
+            # Extract Last Updated from the footer if it exists
+            try:
+                footer_loc = card.locator("div.items-center.p-6.pt-2.border-t > span")
+                if await footer_loc.count() > 0:
+                    footer_text = (await footer_loc.first.text_content(timeout=budget.timeout(self.config.SHORT_TIMEOUT)) or "").strip()
+                    if footer_text.startswith("Updated:"):
+                        product_info["footer_last_updated"] = footer_text.replace("Updated:", "").strip()
+            except Exception as footer_err:
+                print(f"Error extracting footer: {footer_err}")
+        
+            return product_info
+    
+    async def click_next_page(self, page):
+        """Clicks the Next pagination button and waits for the next page's data. Raises on failure."""
+        with metrics.span("scrape.next_page"):
+            async with pacing.request("next_page"):
+                next_button = await selector_resolver.locate(page, "Next Page", self.config.NEXT_PAGE_SELECTOR, timeout=self.config.SHORT_TIMEOUT)
+                await next_button.click(timeout=self.config.SHORT_TIMEOUT*2)
+                # With network capture the next payload is all we need; otherwise wait for the page to go idle
+                if not (self.capture.is_attached() and await self.capture.wait_for_records(self.config.CAPTURE_WAIT_TIMEOUT)):
+                    if self.capture.is_attached():
+                        metrics.incr("fallbacks", "capture_to_networkidle")
+                    await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.LONG_TIMEOUT))
+    
+    def pagination_buttons(self, page):
+        return page.locator(self.config.PAGINATION_SELECTOR).locator("button, a")
+    
+    async def get_total_pages(self, page):
+        """Returns the total page count from the pagination controls ("Page X of Y" or the highest numbered button)."""
+        try:
+            pagination_text = " ".join(await page.locator(self.config.PAGINATION_SELECTOR).all_text_contents())
+            labels = await self.pagination_buttons(page).all_text_contents()
+        except Exception as e:
+            print(f"Could not read pagination controls: {e}")
+            return None
+        match = re.search(r'page\s*\d+\s*(?:of|/)\s*(\d+)', pagination_text, re.IGNORECASE)
+        if match:
+            print(f"Detected {match.group(1)} pages from pagination text.")
+            return int(match.group(1))
+        page_numbers = [int(label.strip()) for label in labels if label.strip().isdigit()]
+        if not page_numbers:
+            print("No numbered pagination buttons found; total page count unknown.")
+            return None
+        print(f"Detected {max(page_numbers)} pages from pagination controls.")
+        return max(page_numbers)
+    
+    async def get_current_page(self, page):
+        """Returns the active page number from the aria-current pagination button or the URL query, or None.
+        
+        The button comes first: it is what the app rendered, while the URL only says what was asked for.
+        """
+        try:
+            current = page.locator(self.config.PAGINATION_SELECTOR).locator("[aria-current='page']")
+            if await current.count() > 0:
+                label = (await current.first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
+                if label.isdigit():
+                    return int(label)
+        except Exception as e:
+            print(f"Could not read the active pagination button: {e}")
+        query = parse_qs(urlparse(page.url).query)
+        value = (query.get(self.config.PAGE_QUERY_PARAM) or [""])[0]
+        if value.isdigit():
+            return int(value)
+        return None
+    
+    async def wait_for_current_page(self, page, target_page):
+        """Re-reads the active page until it is target_page or SHORT_TIMEOUT passes; the app may re-render after its data arrives."""
+        deadline = time.monotonic() + budget.timeout(self.config.SHORT_TIMEOUT) / 1000
+        shown = await self.get_current_page(page)
+        while shown != target_page and time.monotonic() < deadline:
+            await page.wait_for_timeout(100)
+            shown = await self.get_current_page(page)
+        return shown
+    
+    async def goto_page_by_url(self, page, target_page):
+        """Seeks by rewriting the page query parameter, when the app keeps page state in the URL. Returns False unless the app shows target_page."""
+        parts = urlparse(page.url)
+        query = parse_qs(parts.query)
+        if self.config.PAGE_QUERY_PARAM not in query:
+            return False
+        query[self.config.PAGE_QUERY_PARAM] = [str(target_page)]
+        self.capture.take_records()
+        async with pacing.request("seek"):
+            await page.goto(urlunparse(parts._replace(query=urlencode(query, doseq=True))), wait_until="domcontentloaded", timeout=budget.timeout(self.config.LONG_TIMEOUT))
+            if not (self.capture.is_attached() and await self.capture.wait_for_records(self.config.CAPTURE_WAIT_TIMEOUT)):
+                await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.LONG_TIMEOUT))
+        shown = await self.wait_for_current_page(page, target_page)
+        if shown != target_page:
+            print(f"Loaded ?{self.config.PAGE_QUERY_PARAM}={target_page} but the app shows page {shown}.")
+            return False
+        return True
+    
+    async def goto_page_by_buttons(self, page, target_page):
+        """Seeks by clicking numbered pagination buttons, hopping through windowed paginations. Every hop is re-read."""
+        current = await self.get_current_page(page)
+        if current is None:
+            return False  # Hops could not be checked
+        while current != target_page:
+            labels = await self.pagination_buttons(page).all_text_contents()
+            numbers = [int(label.strip()) for label in labels if label.strip().isdigit()]
+            # Jump to the target if shown, otherwise to the visible number closest to it
+            candidates = [n for n in numbers if n != current]
+            if not candidates:
+                return False
+            hop = min(candidates, key=lambda n: abs(n - target_page))
+            if abs(hop - target_page) >= abs(current - target_page):
+                return False
+            button = self.pagination_buttons(page).filter(has_text=re.compile(rf"^\s*{hop}\s*$")).first
+            self.capture.take_records()
+            async with pacing.request("seek"):
+                await button.click(timeout=self.config.SHORT_TIMEOUT*2)
+                if not (self.capture.is_attached() and await self.capture.wait_for_records(self.config.CAPTURE_WAIT_TIMEOUT)):
+                    await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.LONG_TIMEOUT))
+            current = await self.wait_for_current_page(page, hop)
+            if current != hop:
+                print(f"Clicked pagination button {hop} but the app shows page {current}.")
+                return False
+        return True
+    
+    async def advance_to_page(self, page, target_page, from_page=1):
+        """Moves from from_page to target_page by clicking Next, without extracting anything. Returns True on success."""
+        for current in range(from_page, target_page):
+            # Payloads for skipped pages are not ours to keep
+            self.capture.take_records()
+            try:
+                await self.click_next_page(page)
+            except Exception as e:
+                print(f"Failed to advance from page {current} towards page {target_page}: {e}")
+                return False
+        print(f"Advanced to page {target_page}.")
+        return True
+    
+    async def goto_page(self, page, target_page, from_page=1):
+        """Jumps straight to target_page: URL query state first, then numbered buttons, then serial Next clicks.
+        
+        from_page is where the Next-click fallback assumes the page is when the app doesn't show it; pass None
+        when the position is unknown (e.g. a page parked after another scrape) so that fallback fails instead.
+        """
+        print(f"Seeking to page {target_page}...")
+        try:
+            if await self.goto_page_by_url(page, target_page):
+                print(f"Jumped to page {target_page} via the URL.")
+                return True
+        except Exception as e:
+            metrics.incr("fallbacks", "seek_url")
+            print(f"URL seek to page {target_page} failed: {e}")
+        try:
+            if await self.goto_page_by_buttons(page, target_page):
+                print(f"Jumped to page {target_page} via pagination buttons.")
+                return True
+        except Exception as e:
+            metrics.incr("fallbacks", "seek_buttons")
+            print(f"Pagination button seek to page {target_page} failed: {e}")
+        metrics.incr("fallbacks", "seek_next_clicks")
+        current = await self.get_current_page(page) or from_page
+        if current is None:
+            print(f"Cannot tell the current page, so Next clicks can't reach page {target_page}.")
+            return False
+        if current > target_page:
+            print(f"Cannot step back from page {current} to page {target_page} with Next clicks.")
+            return False
+        if not await self.advance_to_page(page, target_page, from_page=current):
+            return False
+        shown = await self.wait_for_current_page(page, target_page)
+        if shown is not None and shown != target_page:
+            print(f"Advanced towards page {target_page} but the app shows page {shown}.")
+            return False
+        return True
+    
+    async def restore_scroll_position(self, page, cards_seen):
+        """Scrolls an infinite-scroll view until it holds more than cards_seen cards. Returns False if it can't."""
+        count = await page.locator(self.config.PRODUCT_CARD_SELECTOR).count()
+        while count <= cards_seen:
+            if not await self.scroll_to_load_more(page):
+                print(f"Could only load {count} of the {cards_seen} cards already scraped.")
+                return False
+            count = await page.locator(self.config.PRODUCT_CARD_SELECTOR).count()
+        print(f"Restored scroll position: {count} cards loaded, {cards_seen} already scraped.")
+        return True
+    
+    async def iter_pages(self, page, start_page=1, end_page=None, resume_from=None, delta=None, seek=False):
+        """Async generator over the inventory, one dict per page once its cards are extracted.
+        
+        Each batch holds "page", "records" (normalized, or DeltaTracker change records), and the position
+        needed to checkpoint it ("pagination", "cards_seen_in_view", "total_cards_processed"). The next page
+        is not loaded until the consumer asks for it, so a slow consumer pauses the crawl. The last batch
+        is marked "final", carries delta removals when the crawl was complete, "reached_end" when it ran out
+        of content, "deadline" when the run or phase budget ran out before the end, and "stopped_early" when a
+        page could not be loaded. seek=True seeks to start_page even when it is 1, for a page left elsewhere by
+        an earlier scrape. Errors propagate.
+        """
+        print("\n--- Starting Scraping ---")
+        # Wait for the page to stabilize
+        await page.wait_for_load_state('networkidle', timeout=budget.timeout(self.config.DEFAULT_TIMEOUT))
+        await self.waiter.wait_for_dom_settled(page, timeout=self.config.RENDER_SETTLE_TIMEOUT)  # Let client-side rendering finish
+        
+        # Record the initial state
+        debug_artifacts.snapshot(page, "scrape_initial_state")
+        
+        # Check if pagination exists
+        has_pagination = await page.locator(self.config.PAGINATION_SELECTOR).count() > 0
+        print(f"Pagination detected: {has_pagination}")
+        # A delta crawl only emits removals once it has provably seen the last page
+        total_pages = await self.get_total_pages(page) if delta is not None and has_pagination else None
+        
+        page_num = 1
+        total_cards_processed = 0
+        cards_seen_in_view = 0  # Cards loaded in the current view; lets --resume restore an infinite-scroll position
+        cards_pruned_in_view = 0  # Cards removed from the current view by DOM pruning
+        more_content_available = True
+        reached_end = False  # Set when the scrape runs out of content rather than stopping early
+        stopped_by_deadline = False  # Set when the run/phase budget ran out; the scrape is incomplete
+        stopped_early = False  # Set when a page could not be loaded or seeked to; the scrape is incomplete
+        self.dedup.load_state(None)
+        
+        if resume_from:
+            print(f"Resuming after page {resume_from['last_page']} ({resume_from['products_written']} products already written).")
+            total_cards_processed = resume_from["total_cards_processed"]
+            if "dedup_offset" in resume_from:
+                self.dedup.load_journal(resume_from["dedup_file"], resume_from["dedup_offset"])
+            else:
+                self.dedup.load_state(resume_from.get("dedup_index"))  # Checkpoints written before the journal
+            if has_pagination:
+                start_page = resume_from["last_page"] + 1
+            else:
+                # Infinite scroll can't seek, so reload cards up to where the last run stopped
+                page_num = resume_from["last_page"] + 1
+                cards_seen_in_view = resume_from["cards_seen_in_view"]
+                if not await self.restore_scroll_position(page, cards_seen_in_view):
+                    more_content_available = False
+                    stopped_early = True
+        
+        if start_page > 1 or seek:
+            if not await self.goto_page(page, start_page, from_page=None if seek else 1):
+                more_content_available = False
+                stopped_early = True
+            page_num = start_page
+        
+        # Continue until no more content can be loaded
+        while more_content_available:
+            if budget.expired():
+                print(f"Deadline reached before page {page_num}. Stopping with the pages scraped so far.")
+                metrics.incr("budget_exhausted", "scrape_stopped")
+                stopped_by_deadline = True
+                break
             
-            # Check if pagination exists
-            has_pagination = await page.locator(self.config.PAGINATION_SELECTOR).count() > 0
-            print(f"Pagination detected: {has_pagination}")
+            print(f"\n--- Processing Page {page_num} ---")
+            page_started = time.perf_counter()
             
-            page_num = 1
-            total_cards_processed = 0
-            more_content_available = True
+            # Track if we found any new cards in this iteration
+            new_cards_found = False
+            page_records = []
+            card_errors_on_this_page = 0
             
-            # Continue until no more content can be loaded
-            while more_content_available:
-                print(f"\n--- Processing Page {page_num} ---")
-                
+            # Prefer records captured from the inventory API; the DOM is the fallback
+            captured_records = self.capture.take_records() if self.capture.is_attached() else []
+            if captured_records:
+                print(f"Using {len(captured_records)} records captured from the network for page {page_num}.")
+                new_cards_found = True
+                processed_on_this_page = 0
+                for product_info in captured_records:
+                    if not self.dedup.add(record_fingerprint(product_info)):
+                        continue
+                    product_info = normalize_record(product_info)
+                    if delta is not None:
+                        product_info = delta.classify(product_info)
+                    if product_info is not None:  # None: unchanged since the previous run
+                        page_records.append(product_info)
+                    processed_on_this_page += 1
+                total_cards_processed += processed_on_this_page
+                cards_seen_in_view += processed_on_this_page
+            else:
                 # Ensure product cards are loaded
                 try:
-                    await page.locator(self.config.PRODUCT_CARD_SELECTOR).first.wait_for(state="visible", timeout=self.config.LONG_TIMEOUT)
+                    await page.locator(self.live_card_selector).first.wait_for(state="visible", timeout=budget.timeout(self.config.LONG_TIMEOUT))
                 except PlaywrightTimeoutError:
                     print(f"No cards found on page {page_num}. Taking screenshot.")
-                    await page.screenshot(path=f"debug_no_cards_page_{page_num}.png")
-                    more_content_available = False
+                    await debug_artifacts.capture_failure(page, f"no_cards_page_{page_num}")
+                    stopped_early = True
                     break
-                
+            
                 # Sometimes we need to wait a bit more for all cards to render
-                await asyncio.sleep(1)
-                
-                # Count cards on current view
-                card_locators = page.locator(self.config.PRODUCT_CARD_SELECTOR)
-                count = await card_locators.count()
+                await self.waiter.wait_for_dom_settled(page, timeout=self.config.PAGE_SETTLE_TIMEOUT)
+            
+                # Read every card's text in one call; it fingerprints the card for the dedup index
+                card_locators = page.locator(self.live_card_selector)
+                card_texts = await card_locators.all_text_contents()
+                count = len(card_texts)
                 print(f"Found {count} product cards on current view.")
-                
+            
                 if count == 0:
                     print("Warning: No cards found on current view. Taking screenshot.")
-                    await page.screenshot(path=f"debug_no_cards_page_{page_num}.png")
-                    more_content_available = False
+                    await debug_artifacts.capture_failure(page, f"no_cards_page_{page_num}")
+                    stopped_early = True
                     break
-                    
-                # Track if we found any new cards in this iteration
-                new_cards_found = False
-                processed_on_this_page = 0
                 
-                # Process visible cards
-                for i in range(count):
-                    card = card_locators.nth(i)
-                    
-                    # Check if we've already processed this card (by position)
-                    if i < (total_cards_processed - processed_on_this_page):
+                # Skip cards already collected (re-scrolled, re-rendered or overlapping pages) before extracting
+                fingerprints = [card_fingerprint(text) for text in card_texts]
+                new_indices = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in self.dedup]
+                print(f"{len(new_indices)} of {count} cards are new.")
+                
+                # Pull the new cards in one round-trip; fall back to per-field locators if that fails
+                batch_records = None
+                if self.config.BATCH_EXTRACTION and new_indices:
+                    with metrics.span("scrape.batch_extract"):
+                        batch_records = await self.extract_cards_batch(page, new_indices)
+                    if batch_records is not None and len(batch_records) != len(new_indices):
+                        metrics.incr("fallbacks", "batch_to_per_field")
+                        print(f"Batch extraction returned {len(batch_records)} cards, expected {len(new_indices)}. Falling back to per-field extraction.")
+                        batch_records = None
+            
+                # Process new cards
+                for n, i in enumerate(new_indices):
+                    # Identical cards within one view are only kept once
+                    if fingerprints[i] in self.dedup:
                         continue
-                        
+                    
                     new_cards_found = True
-                    product_info = {}
                     print(f"Processing Card {total_cards_processed+1} (Page {page_num}, Card {i+1}/{count})...")
-                    
+                
                     try:
-                        # Try to scroll the card into view
-                        try:
-                            await card.scroll_into_view_if_needed(timeout=self.config.SHORT_TIMEOUT)
-                        except Exception as scroll_err:
-                            print(f"Non-critical: Couldn't scroll card into view: {scroll_err}")
-                        
-                        # Extract Name (h3)
-                        try:
-                            product_info["name"] = (await card.locator("h3").first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-                        except Exception as e:
-                            print(f"Error extracting name: {e}")
-                            product_info["name"] = "Unknown"
-        
-                        # Extract ID (p.text-muted-foreground.font-mono)
-                        try:
-                            id_text = (await card.locator("p.text-xs.text-muted-foreground.font-mono").first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-                            product_info["id"] = id_text.replace("ID:", "").strip()
-                        except Exception as e:
-                            print(f"Error extracting ID: {e}")
-                            product_info["id"] = "Unknown"
-        
-                        # Extract Category (div.rounded-full...)
-                        try:
-                            product_info["category"] = (await card.locator("div[class*='rounded-full'][class*='bg-primary']").first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-                        except Exception as e:
-                            print(f"Error extracting category: {e}")
-                            product_info["category"] = "Unknown"
-        
-                        # Extract details from Definition List (dl > div > dt/dd)
-                        try:
-                            details_rows = card.locator("dl > div.flex.items-center.justify-between")
-                            details_count = await details_rows.count()
-        
-                            for j in range(details_count):
-                                row = details_rows.nth(j)
-                                label_loc = row.locator("dt.text-muted-foreground")
-                                value_loc = row.locator("dd.font-medium")
-        
-                                label = (await label_loc.first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip().replace(':', '')
-                                value = (await value_loc.first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-        
-                                # Special handling for Rating (nested span)
-                                if label == "Rating":
-                                    # Try to find the rating directly
-                                    rating_span = value_loc.locator("span.ml-1.text-sm.text-muted-foreground")
-                                    if await rating_span.count() > 0:
-                                        value = (await rating_span.first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-                                    # If rating not found in span, try to extract the numeric value from the text
-                                    elif value and any(c.isdigit() for c in value):
-                                        import re
-                                        # Extract numeric part using regex
-                                        match = re.search(r'(\d+\.\d+)', value)
-                                        if match:
-                                            value = match.group(1)
-        
-                                if label:  # Only add if label is found
-                                    key = label.lower().replace(' ', '_').replace('(', '').replace(')', '')
-                                    product_info[key] = value
-                        except Exception as details_err:
-                            print(f"Error extracting details: {details_err}")
-        
-                        # Extract Last Updated from the footer if it exists
-                        try:
-                            footer_loc = card.locator("div.items-center.p-6.pt-2.border-t > span")
-                            if await footer_loc.count() > 0:
-                                footer_text = (await footer_loc.first.text_content(timeout=self.config.SHORT_TIMEOUT) or "").strip()
-                                if footer_text.startswith("Updated:"):
-                                    product_info["footer_last_updated"] = footer_text.replace("Updated:", "").strip()
-                        except Exception as footer_err:
-                            print(f"Error extracting footer: {footer_err}")
-                        
-                        products_data.append(product_info)
+                        if batch_records is not None:
+                            product_info = batch_records[n]
+                        else:
+                            with metrics.span("scrape.card"):
+                                product_info = await self.extract_card_fields(card_locators.nth(i))
+                        product_info = normalize_record(product_info)
+                        print(f"Card processed: {product_info.get('name', 'N/A')}. Total: {total_cards_processed+1}")
+                        if delta is not None:
+                            product_info = delta.classify(product_info)
+                        if product_info is not None:  # None: unchanged since the previous run
+                            page_records.append(product_info)
+                        self.dedup.add(fingerprints[i])
                         total_cards_processed += 1
-                        processed_on_this_page += 1
-                        print(f"Card processed: {product_info.get('name', 'N/A')}. Total: {total_cards_processed}")
-                        
-                        # Periodically save progress
-                        if total_cards_processed % 100 == 0:
-                            print(f"Saving progress: {total_cards_processed} cards processed so far...")
-                            with open(self.config.OUTPUT_FILE, 'w') as f:
-                                json.dump(products_data, f, indent=2)
-                    
+                
                     except Exception as card_err:
+                        card_errors_on_this_page += 1
                         print(f"Error processing card: {card_err}")
-                        await page.screenshot(path=f"debug_card_error_page{page_num}_card{i+1}.png")
-                
-                # Save state before attempting next page navigation
-                await page.screenshot(path=f"debug_after_page_{page_num}.png")
+                        await debug_artifacts.capture_failure(page, f"card_error_page{page_num}_card{i+1}")
                 
-                # Check if we found any new cards on this page
-                if not new_cards_found:
-                    print("No new cards found on this page. This may indicate we've already processed all cards.")
-                    more_content_available = False
+                cards_seen_in_view = cards_pruned_in_view + count
+            
+            # Extraction only; consumer time (sink writes, checkpoints) after the yield is not part of the page
+            metrics.record("scrape.page", time.perf_counter() - page_started)
+            
+            if self.recorder is not None:
+                await self.recorder.save_page(page, page_num)
+            
+            # Hand this page to the consumer; the crawl resumes (and may prune or navigate) only after it returns
+            yield {
+                "page": page_num,
+                "records": page_records,
+                "pagination": has_pagination,
+                "cards_seen_in_view": cards_seen_in_view,
+                "total_cards_processed": total_cards_processed,
+                "final": False,
+            }
+            
+            # Keep an infinite-scroll DOM flat once this page is committed (failed cards stay for a retry)
+            if self.config.PRUNE_EXTRACTED_CARDS and not has_pagination and not captured_records and card_errors_on_this_page == 0:
+                with metrics.span("scrape.prune"):
+                    cards_pruned_in_view += await self.prune_extracted_cards(page)
+            
+            # Save state before attempting next page navigation
+            debug_artifacts.snapshot(page, f"after_page_{page_num}")
+            
+            # In delta mode, stop once enough consecutive pages match the previous run
+            if delta is not None:
+                unchanged_pages = delta.finish_page()
+                if delta.should_stop():
+                    print(f"{unchanged_pages} consecutive pages unchanged since the previous run. Stopping delta scrape.")
                     break
-                    
-                # Determine how to navigate to next page/batch
-                next_page_exists = await page.locator(self.config.NEXT_PAGE_SELECTOR).count() > 0
+            
+            # Check if we found any new cards on this page
+            if not new_cards_found:
+                print("No new cards found on this page. This may indicate we've already processed all cards.")
+                reached_end = True
+                break
+            
+            # Stop at the end of the assigned slice
+            if end_page is not None and page_num >= end_page:
+                print(f"Reached the last page of this slice ({end_page}).")
+                break
                 
-                if has_pagination and next_page_exists:
-                    # If pagination exists, click next page button
-                    print("Clicking Next Page button...")
-                    next_button = page.locator(self.config.NEXT_PAGE_SELECTOR).first
-                    try:
-                        await next_button.wait_for(state="visible", timeout=self.config.SHORT_TIMEOUT)
-                        await next_button.click(timeout=self.config.SHORT_TIMEOUT*2)
-                        await page.wait_for_load_state('networkidle', timeout=self.config.LONG_TIMEOUT)
-                        print("Successfully clicked Next Page button.")
-                    except Exception as e:
-                        print(f"Failed to click Next Page button: {e}. Trying infinite scroll approach.")
-                        # If clicking fails, try scrolling to bottom as fallback
-                        more_content_loaded = await self.scroll_to_load_more(page)
-                        if not more_content_loaded:
-                            print("No more cards could be loaded through scrolling. Ending scrape.")
-                            more_content_available = False
-                else:
-                    # If no pagination or next button, try infinite scroll
-                    print("No pagination detected or no Next button. Scrolling to load more...")
+            # Determine how to navigate to next page/batch
+            next_page_exists = await selector_resolver.exists(page, "Next Page", self.config.NEXT_PAGE_SELECTOR)
+            
+            if has_pagination and next_page_exists:
+                # If pagination exists, click next page button
+                print("Clicking Next Page button...")
+                try:
+                    await self.click_next_page(page)
+                    cards_seen_in_view = 0
+                    cards_pruned_in_view = 0
+                    print("Successfully clicked Next Page button.")
+                except Exception as e:
+                    metrics.incr("fallbacks", "next_to_scroll")
+                    print(f"Failed to click Next Page button: {e}. Trying infinite scroll approach.")
+                    # If clicking fails, try scrolling to bottom as fallback
                     more_content_loaded = await self.scroll_to_load_more(page)
                     if not more_content_loaded:
-                        print("No more cards could be loaded through scrolling. Ending scrape.")
+                        # The Next button is still there, so this is a failed load, not the end of the inventory
+                        print("Next Page failed and scrolling loaded nothing. Stopping; the scrape is incomplete.")
                         more_content_available = False
-                        break
-                
-                # Increment page counter for tracking
-                page_num += 1
-                
-                # Avoid endless loop - safety mechanism in case detection of new content fails
-                if page_num > 500:  # Increased but still reasonable limit
-                    print("Reached maximum page safety limit (500). Stopping to prevent infinite loop.")
+                        stopped_early = True
+            else:
+                # If no pagination or next button, try infinite scroll
+                print("No pagination detected or no Next button. Scrolling to load more...")
+                more_content_loaded = await self.scroll_to_load_more(page)
+                if not more_content_loaded:
+                    print("No more cards could be loaded through scrolling. Ending scrape.")
+                    reached_end = True
                     break
             
-            print(f"\n--- Scraping Finished. Successfully processed {len(products_data)} products. ---")
-            return products_data
-
+            # Increment page counter for tracking
+            page_num += 1
+            
+            # Avoid endless loop - safety mechanism in case detection of new content fails
+            if page_num > 500:  # Increased but still reasonable limit
+                print("Reached maximum page safety limit (500). Stopping to prevent infinite loop.")
+                stopped_early = True
+                break
+        
+        # Products missing from a complete crawl were removed (a slice, early stop or short crawl can't tell)
+        crawl_complete = (reached_end and not stopped_early and not stopped_by_deadline
+                          and start_page == 1 and end_page is None and (total_pages is None or page_num >= total_pages))
+        removals = []
+        if delta is not None:
+            if crawl_complete:
+                removals = delta.removals()
+            elif reached_end:
+                print(f"Crawl ended on page {page_num} of {total_pages}; skipping delta removals.")
+        yield {
+            "page": page_num,
+            "records": removals,
+            "pagination": has_pagination,
+            "cards_seen_in_view": cards_seen_in_view,
+            "total_cards_processed": total_cards_processed,
+            "final": True,
+            "reached_end": reached_end,
+            "deadline": stopped_by_deadline,
+            "stopped_early": stopped_early,
+        }
+    
+    async def iter_products(self, page, batches=False, **options):
+        """Streams products as they are extracted: `async for product in scraper.iter_products(page)`.
+        
+        With batches=True each item is one page's list of records instead. Accepts the same options as
+        iter_pages (start_page, end_page, resume_from, delta); pages are only advanced as the consumer pulls.
+        """
+        async for batch in self.iter_pages(page, **options):
+            if batches:
+                if batch["records"]:
+                    yield batch["records"]
+            else:
+                for record in batch["records"]:
+                    yield record
+    
+    async def scrape_product_data(self, page, sink=None, start_page=1, end_page=None, checkpoint=None, resume_from=None, delta=None, seek=False):
+        """Scrapes data from product cards on the inventory page with pagination or infinite scroll handling.
+        
+        Without a sink the products are collected and returned as a list. With a sink (e.g. JsonlSink)
+        each record is streamed to it, flushed once per page, and the number of products written is returned.
+        start_page/end_page restrict a paginated scrape to an inclusive slice of pages (used by parallel workers);
+        seek=True always seeks to start_page, for a page that is not on page 1 (e.g. a worker retrying a slice).
+        With a sink and a ScrapeCheckpoint, progress is checkpointed after every page; pass a loaded checkpoint
+        as resume_from to continue after its last completed page.
+        With a loaded DeltaTracker only added/changed (and, after a complete crawl, removed) change records are
+        emitted, and the scrape stops once DELTA_STOP_AFTER_UNCHANGED_PAGES consecutive pages had no changes.
+        This is a thin consumer of iter_pages; errors end the scrape with the partial results. How the scrape
+        ended ("completed", "partial", "deadline" or "failed") is left in self.outcome.
+        """
+        products_data = []
+        products_written = resume_from["products_written"] if resume_from else 0
+        self.outcome = "failed"  # Until the final batch arrives
+        checkpoint_state = resume_from
+        if sink is not None and checkpoint is not None:
+            # Fingerprints go to an append-only journal; each checkpoint only stores its offset
+            self.dedup.open_journal(self.config.DEDUP_JOURNAL_FILE, resume_from.get("dedup_offset") if resume_from else None)
+        try:
+            async for batch in self.iter_pages(page, start_page=start_page, end_page=end_page, resume_from=resume_from, delta=delta, seek=seek):
+                if batch["final"]:
+                    self.outcome = "deadline" if batch["deadline"] else "partial" if batch["stopped_early"] else "completed"
+                if sink is None:
+                    saved_before = len(products_data) // 100
+                    products_data.extend(batch["records"])
+                    # Periodically save progress (the sink already persists every page)
+                    if len(products_data) // 100 > saved_before:
+                        print(f"Saving progress: {len(products_data)} products so far...")
+                        with open(self.config.OUTPUT_FILE, 'w') as f:
+                            json.dump(products_data, f, indent=2)
+                    continue
+                
+                # Commit this page's records before the crawl moves on
+                sink.write_batch(batch["records"])
+                products_written += len(batch["records"])
+                if batch["final"]:
+                    # Only a crawl that ran out of content is complete; early stops stay resumable from the last page
+                    if checkpoint is not None and checkpoint_state is not None and batch["reached_end"]:
+                        checkpoint.save(dict(checkpoint_state, completed=True))
+                elif checkpoint is not None:
+                    checkpoint_state = {
+                        "last_page": batch["page"],
+                        "pagination": batch["pagination"],
+                        "cards_seen_in_view": batch["cards_seen_in_view"],
+                        "total_cards_processed": batch["total_cards_processed"],
+                        "dedup_file": self.dedup.journal.name,
+                        "dedup_offset": self.dedup.commit(),
+                        "products_written": products_written,
+                        "output_file": sink.path,
+                        "output_offset": sink.tell(),
+                        "completed": False,
+                    }
+                    checkpoint.save(checkpoint_state)
+        
         except Exception as e:
             print(f"An error occurred during scraping: {e}")
             try:
                 if not page.is_closed(): 
-                    await page.screenshot(path="debug_scrape_error.png")
+                    await debug_artifacts.capture_failure(page, "scrape_error")
             except Exception: pass
             # Return partial results if any
-            return products_data
\ No newline at end of file
+        finally:
+            self.stop_capture()
+            self.dedup.close_journal()
+        
+        if sink is not None:
+            sink.flush()
+            print(f"\n--- Scraping Finished. Successfully processed {products_written} products. ---")
+            return products_written
+        print(f"\n--- Scraping Finished. Successfully processed {len(products_data)} products. ---")
+        return products_data
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import atexit
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from config import Config
+from metrics import metrics
+
+
+def split_selector_list(selector):
+    """Splits a comma-separated selector list at top-level commas (ignoring commas in quotes, () and [])."""
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in selector:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+class SelectorResolver:
+    """Pins the alternative of a Config OR-selector that actually matched, per logical element, across runs.
+
+    Lookups try the pinned alternative first and only evaluate the full list when it misses; the pin only
+    moves when that wait resolves to a different alternative, so a slow element keeps its pin. Changed pins
+    are written at most every SELECTOR_CACHE_SAVE_INTERVAL seconds and once more at exit.
+    """
+
+    def __init__(self, path=None):
+        self.config = Config()
+        self.path = path or self.config.SELECTOR_CACHE_FILE
+        self.enabled = self.config.SELECTOR_CACHE
+        self.pins = self.load() if self.enabled else {}  # name -> {"source": full selector, "pinned": alternative}
+        self.dirty = False
+        self.last_save = time.monotonic()
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                pins = json.load(f)
+            return pins if isinstance(pins, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read selector cache {self.path}: {e}")
+            return {}
+
+    def save(self):
+        self.dirty = False
+        self.last_save = time.monotonic()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.pins, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save selector cache {self.path}: {e}")
+
+    def pinned(self, name, selector):
+        """The pinned alternative for name, if it was pinned from this same selector list."""
+        entry = self.pins.get(name)
+        if entry and entry.get("source") == selector and entry.get("pinned") in split_selector_list(selector):
+            return entry["pinned"]
+        return None
+
+    def pin(self, name, selector, alternative):
+        if self.pins.get(name) == {"source": selector, "pinned": alternative}:
+            return
+        self.pins[name] = {"source": selector, "pinned": alternative}
+        self.dirty = True
+        if time.monotonic() - self.last_save >= self.config.SELECTOR_CACHE_SAVE_INTERVAL:
+            self.save()
+
+    def flush(self):
+        """Writes pins changed since the last save."""
+        if self.dirty:
+            self.save()
+
+    async def locate(self, page, name, selector, timeout=None, state="visible"):
+        """Waits for the element and returns its locator, resolved through the pinned alternative when possible.
+
+        Raises PlaywrightTimeoutError like locator.wait_for if no alternative reaches state within timeout.
+        """
+        if timeout is None:
+            timeout = self.config.DEFAULT_TIMEOUT
+        alternatives = split_selector_list(selector)
+        if not self.enabled or len(alternatives) < 2:
+            element = page.locator(selector).first
+            await element.wait_for(state=state, timeout=timeout)
+            return element
+
+        pinned = self.pinned(name, selector)
+        if pinned:
+            element = page.locator(pinned).first
+            pin_timeout = min(timeout, self.config.SELECTOR_PIN_TIMEOUT)
+            try:
+                await element.wait_for(state=state, timeout=pin_timeout)
+                metrics.incr("selector_cache", "hit")
+                return element
+            except PlaywrightTimeoutError:
+                metrics.incr("selector_cache", "miss")
+                print(f"Pinned selector for '{name}' ({pinned}) missed; re-resolving the full list.")
+            # The pinned wait counts against the caller's timeout
+            timeout = max(self.config.MIN_OPERATION_TIMEOUT, timeout - pin_timeout)
+            # A slow element may still turn up under its pinned alternative; check it first
+            alternatives = [pinned] + [alternative for alternative in alternatives if alternative != pinned]
+
+        element = page.locator(selector).first
+        await element.wait_for(state=state, timeout=timeout)
+        for alternative in alternatives:
+            candidate = page.locator(alternative).first
+            if await candidate.count() and (state != "visible" or await candidate.is_visible()):
+                self.pin(name, selector, alternative)
+                return candidate
+        return element
+
+    async def exists(self, page, name, selector):
+        """Whether any alternative currently matches, checking the pinned one first."""
+        pinned = self.pinned(name, selector) if self.enabled else None
+        if pinned and await page.locator(pinned).count() > 0:
+            metrics.incr("selector_cache", "hit")
+            return True
+        return await page.locator(selector).count() > 0
+
+
+selector_resolver = SelectorResolver()
@@ -0,0 +1,143 @@
+import os
+import json
+
+
+class JsonlSink:
+    """Append-only JSONL writer that buffers records and flushes them in batches."""
+
+    def __init__(self, path, batch_size=50, append=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record):
+        """Buffers a single record, flushing once the batch is full."""
+        self.buffer.append(json.dumps(record, ensure_ascii=False))
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_batch(self, records):
+        """Buffers a batch of records (e.g. one page) and flushes it as a unit."""
+        for record in records:
+            self.buffer.append(json.dumps(record, ensure_ascii=False))
+            self.count += 1
+        self.flush()
+
+    def flush(self):
+        """Writes buffered records to disk and fsyncs so a crash loses at most one batch."""
+        if not self.buffer or self.file.closed:
+            return
+        self.file.write("\n".join(self.buffer) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer = []
+
+    def tell(self):
+        """Returns the byte offset of the flushed end of the stream."""
+        self.flush()
+        return self.file.tell()
+
+    def close(self, status=None):
+        """Flushes and closes the file. status (how the run ended) only matters to sinks that record it."""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def finalize(self, json_path=None):
+        """Closes the stream and optionally converts it into the legacy pretty-printed JSON array."""
+        self.close()
+        if json_path:
+            jsonl_to_json(self.path, json_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TeeSink:
+    """Writes every record to a primary sink and mirrors it to others; path and offsets come from the primary."""
+
+    def __init__(self, primary, *mirrors):
+        self.primary = primary
+        self.mirrors = mirrors
+
+    @property
+    def path(self):
+        return self.primary.path
+
+    def write(self, record):
+        for sink in (self.primary,) + self.mirrors:
+            sink.write(record)
+
+    def write_batch(self, records):
+        for sink in (self.primary,) + self.mirrors:
+            sink.write_batch(records)
+
+    def flush(self):
+        for sink in (self.primary,) + self.mirrors:
+            sink.flush()
+
+    def tell(self):
+        for sink in self.mirrors:
+            sink.flush()
+        return self.primary.tell()
+
+    def close(self, status=None):
+        self.primary.close()
+        for sink in self.mirrors:
+            sink.close(status or "completed")
+
+    def finalize(self, json_path=None):
+        self.primary.finalize(json_path)
+        for sink in self.mirrors:
+            sink.finalize()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close("failed" if exc_type else "completed")
+
+
+def truncate_jsonl(path, offset):
+    """Cuts a JSONL file back to a known-good byte offset, discarding records written after it."""
+    if not os.path.exists(path):
+        open(path, "w").close()
+        return
+    with open(path, "r+b") as f:
+        f.truncate(offset)
+    print(f"Truncated {path} to {offset} bytes.")
+
+
+def iter_jsonl(path):
+    """Yields records from a JSONL file one at a time, skipping a torn trailing line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable line in {path}.")
+
+
+def jsonl_to_json(jsonl_path, json_path):
+    """Streams a JSONL file into an indent=2 JSON array without loading it into memory."""
+    tmp_path = json_path + ".tmp"
+    written = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write("[")
+        for record in iter_jsonl(jsonl_path):
+            body = json.dumps(record, indent=2).replace("\n", "\n  ")
+            out.write(("," if written else "") + "\n  " + body)
+            written += 1
+        out.write("\n]" if written else "]")
+    os.replace(tmp_path, json_path)
+    print(f"Wrote {written} products to {json_path}.")
+    return written
@@ -0,0 +1,151 @@
+import json
+import time
+import sqlite3
+
+from config import Config
+from columnar import SCHEMA, typed_row
+from dedup import record_fingerprint
+
+SQL_TYPES = {"string": "TEXT", "float": "REAL", "int": "INTEGER", "date": "TEXT"}
+
+
+class SqliteSink:
+    """Upserting SQLite sink: WAL journal, one transaction per flushed batch, provenance per scrape run.
+
+    Products are keyed on NATURAL_KEY_FIELDS (the card ID alone is not unique), so re-scrapes update rows
+    in place. first_seen_run/last_seen_run/changed_run point into the runs table.
+    """
+
+    def __init__(self, path=None, batch_size=50, mode="full"):
+        self.config = Config()
+        self.path = path or self.config.SQLITE_OUTPUT_FILE
+        self.batch_size = batch_size
+        self.key_fields = tuple(self.config.NATURAL_KEY_FIELDS)
+        self.buffer = []
+        self.count = 0
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, source, mode, status) VALUES (?, ?, ?, 'running')",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), self.config.BASE_URL, mode),
+            )
+        self.run_id = cursor.lastrowid
+        self.upsert_sql = self.build_upsert()
+
+    def create_schema(self):
+        columns = [name for name, _ in SCHEMA]
+        missing_keys = [field for field in self.key_fields if field not in columns]
+        if missing_keys:
+            raise ValueError(f"NATURAL_KEY_FIELDS {missing_keys} are not product columns")
+        column_defs = ",\n                ".join(
+            f"{name} {SQL_TYPES[kind]}" + (" NOT NULL" if name in self.key_fields else "") for name, kind in SCHEMA
+        )
+        with self.conn:
+            self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                finished_at TEXT,
+                source TEXT,
+                mode TEXT,
+                status TEXT,
+                products_written INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS products (
+                {column_defs},
+                extra TEXT,
+                record_hash TEXT NOT NULL,
+                first_seen_run INTEGER REFERENCES runs(run_id),
+                last_seen_run INTEGER REFERENCES runs(run_id),
+                changed_run INTEGER REFERENCES runs(run_id),
+                PRIMARY KEY ({", ".join(self.key_fields)})
+            );
+            CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+            CREATE INDEX IF NOT EXISTS idx_products_price ON products(price_cents);
+            CREATE INDEX IF NOT EXISTS idx_products_last_updated ON products(last_updated);
+            """)
+
+    def build_upsert(self):
+        columns = [name for name, _ in SCHEMA] + ["extra", "record_hash", "first_seen_run", "last_seen_run", "changed_run"]
+        updates = [f"{name} = excluded.{name}" for name, _ in SCHEMA if name not in self.key_fields]
+        updates += [
+            "extra = excluded.extra",
+            "last_seen_run = excluded.last_seen_run",
+            "changed_run = CASE WHEN products.record_hash = excluded.record_hash THEN products.changed_run ELSE excluded.changed_run END",
+            "record_hash = excluded.record_hash",
+        ]
+        return (
+            f"INSERT INTO products ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(self.key_fields)}) DO UPDATE SET {', '.join(updates)}"
+        )
+
+    def row(self, record):
+        typed = typed_row(record)
+        values = []
+        for name, kind in SCHEMA:
+            value = typed[name]
+            if kind == "date" and value is not None:
+                value = value.isoformat()
+            if name in self.key_fields and value is None:
+                value = ""
+            values.append(value)
+        known = {name for name, _ in SCHEMA} | {"size", "price", "price_cents", "last_updated_epoch", "footer_last_updated_epoch"}
+        extra = {key: value for key, value in record.items() if key not in known}
+        values += [
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+            record_fingerprint(record),
+            self.run_id,
+            self.run_id,
+            self.run_id,
+        ]
+        return values
+
+    def write(self, record):
+        """Buffers a single record, committing once the batch is full."""
+        self.buffer.append(self.row(record))
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_batch(self, records):
+        """Upserts a batch of records (e.g. one page) in a single transaction."""
+        for record in records:
+            self.buffer.append(self.row(record))
+            self.count += 1
+        self.flush()
+
+    def flush(self):
+        if not self.buffer or self.conn is None:
+            return
+        with self.conn:
+            self.conn.executemany(self.upsert_sql, self.buffer)
+        self.buffer = []
+
+    def tell(self):
+        """Records written so far (upserts are idempotent, so a resumed run needs no truncation)."""
+        self.flush()
+        return self.count
+
+    def close(self, status="completed"):
+        if self.conn is None:
+            return
+        self.flush()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ?, status = ?, products_written = ? WHERE run_id = ?",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), status, self.count, self.run_id),
+            )
+        self.conn.close()
+        self.conn = None
+
+    def finalize(self, json_path=None):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close("failed" if exc_type else "completed")
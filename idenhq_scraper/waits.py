@@ -0,0 +1,59 @@
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
+
+from config import Config
+
+# Resolves true once no DOM mutation has happened for quietMs, or false when timeoutMs elapses first.
+DOM_SETTLED_SCRIPT = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let deadline = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    const done = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(deadline);
+        resolve(settled);
+    };
+    observer.observe(document.documentElement || document, {
+        childList: true, subtree: true, attributes: true, characterData: true
+    });
+    quietTimer = setTimeout(() => done(true), quietMs);
+    deadline = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+CARD_COUNT_CHANGED_SCRIPT = "([selector, previous]) => document.querySelectorAll(selector).length !== previous"
+
+
+class PageWaiter:
+    """Condition-based waits that return as soon as the condition holds, bounded by a timeout."""
+
+    def __init__(self):
+        self.config = Config()
+
+    async def wait_for_dom_settled(self, page, timeout, quiet_ms=None):
+        """Waits until the DOM has been mutation-free for quiet_ms. Returns False if it never settles."""
+        if quiet_ms is None:
+            quiet_ms = self.config.DOM_SETTLE_MS
+        try:
+            return await page.evaluate(DOM_SETTLED_SCRIPT, [quiet_ms, timeout])
+        except PlaywrightError as e:
+            # A navigation tearing down the execution context is itself the change we were waiting for
+            if "context was destroyed" in str(e).lower() or "navigation" in str(e).lower():
+                return True
+            print(f"Error waiting for DOM to settle: {e}")
+            return False
+
+    async def wait_for_card_count_change(self, page, selector, previous_count, timeout):
+        """Waits until the number of elements matching selector differs from previous_count."""
+        try:
+            await page.wait_for_function(CARD_COUNT_CHANGED_SCRIPT, arg=[selector, previous_count], timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except PlaywrightError as e:
+            print(f"Error waiting for element count change on '{selector}': {e}")
+            return False
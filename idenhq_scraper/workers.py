@@ -0,0 +1,156 @@
+import os
+import json
+import asyncio
+
+from config import Config
+from navigator import Navigator
+from scraper import ProductScraper
+from sink import JsonlSink, iter_jsonl
+from dedup import DedupIndex, record_fingerprint
+from browser_profile import browser_profile
+from pacing import pacing
+from budget import budget
+
+
+def split_page_range(total_pages, workers):
+    """Splits pages 1..total_pages into at most `workers` contiguous, disjoint (start, end) slices."""
+    workers = max(1, min(workers, total_pages))
+    base, extra = divmod(total_pages, workers)
+    slices = []
+    start = 1
+    for k in range(workers):
+        end = start + base - 1 + (1 if k < extra else 0)
+        slices.append((start, end))
+        start = end + 1
+    return slices
+
+
+class ScrapeWorkerPool:
+    """Runs several pages in parallel, each reusing the saved session and scraping its own slice of pages.
+
+    WORKER_CONCURRENCY is the number of pages opened; how many of them load at once is left to the
+    pacing controller, which grows and shrinks that limit with the server's latency and error rate.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.concurrency = max(1, self.config.WORKER_CONCURRENCY)
+        self.outcome = None  # "completed" or "deadline" after run(); failed slices raise instead
+
+    async def open_worker(self, browser, storage_state, worker_id):
+        """Creates an authenticated context/page for one worker and walks it to the inventory grid."""
+        context = await browser_profile.new_context(browser, storage_state=storage_state)
+        page = await context.new_page()
+        page.set_default_timeout(budget.timeout(60000))
+        scraper = ProductScraper()
+        scraper.start_capture(page)
+        try:
+            await page.goto(self.config.BASE_URL + self.config.INSTRUCTIONS_URL_PART, wait_until="domcontentloaded", timeout=budget.timeout(self.config.LONG_TIMEOUT))
+            with budget.phase("navigation"):
+                navigated = await Navigator().navigate_challenge_flow(page)
+            if not navigated:
+                raise Exception("challenge navigation failed")
+        except Exception as e:
+            print(f"[worker {worker_id}] Could not reach the inventory: {e}")
+            await context.close()
+            return None
+        print(f"[worker {worker_id}] Ready on the inventory grid.")
+        return {"id": worker_id, "context": context, "page": page, "scraper": scraper}
+
+    async def scrape_slice(self, worker, index, start_page, end_page, seek=False):
+        """Scrapes one page slice into its own file. Returns the scrape outcome ("completed", "partial", ...).
+
+        seek=True seeks to start_page even when it is page 1; a seek that fails makes the outcome "partial".
+        """
+        path = self.config.WORKER_OUTPUT_PATTERN.format(index)
+        print(f"[worker {worker['id']}] Scraping pages {start_page}-{end_page} into {path}...")
+        with JsonlSink(path, batch_size=self.config.SINK_BATCH_SIZE) as sink:
+            written = await worker["scraper"].scrape_product_data(worker["page"], sink=sink, start_page=start_page, end_page=end_page, seek=seek)
+        outcome = worker["scraper"].outcome
+        print(f"[worker {worker['id']}] Pages {start_page}-{end_page} {outcome} with {written} products.")
+        return outcome
+
+    async def retry_failed_slices(self, workers, slices, outcomes):
+        """Re-runs every failed slice once on a worker whose own slice completed.
+
+        That worker is parked at the end of its own slice, so the retry always seeks to the slice's first page.
+        """
+        healthy = [worker for worker, outcome in zip(workers, outcomes) if outcome == "completed"]
+        for index, outcome in enumerate(outcomes):
+            if outcome in ("completed", "deadline") or not healthy:
+                continue
+            start_page, end_page = slices[index]
+            worker = healthy[index % len(healthy)]
+            print(f"Retrying pages {start_page}-{end_page} on worker {worker['id']}...")
+            try:
+                worker["scraper"].start_capture(worker["page"])
+                outcomes[index] = await self.scrape_slice(worker, index, start_page, end_page, seek=True)
+            except Exception as e:
+                print(f"[worker {worker['id']}] Retry of pages {start_page}-{end_page} failed: {e}")
+        return outcomes
+
+    def merge_outputs(self, paths, sink):
+        """Appends every worker's records to sink in page order, skipping duplicate records."""
+        seen = DedupIndex()
+        duplicates = 0
+        for path in paths:
+            if not path or not os.path.exists(path):
+                continue
+            for record in iter_jsonl(path):
+                if not seen.add(record_fingerprint(record)):
+                    duplicates += 1
+                    continue
+                sink.write(record)
+            os.remove(path)
+        sink.flush()
+        print(f"Merged {len(seen)} unique products ({duplicates} duplicates dropped).")
+        return len(seen)
+
+    async def run(self, browser, sink):
+        """Scrapes the whole inventory with up to WORKER_CONCURRENCY pages. Returns the number of products written.
+
+        A slice that still fails after one retry raises once the other slices are merged, so callers never
+        mistake a run with missing pages for a complete one.
+        """
+        with open(self.config.SESSION_FILE, "r") as f:
+            storage_state = json.load(f)
+
+        print(f"\n--- Starting {self.concurrency} parallel scrape workers ---")
+        opened = await asyncio.gather(*(self.open_worker(browser, storage_state, k) for k in range(self.concurrency)))
+        workers = [worker for worker in opened if worker]
+        if not workers:
+            raise Exception("no worker reached the inventory")
+
+        try:
+            total_pages = await workers[0]["scraper"].get_total_pages(workers[0]["page"])
+            if not total_pages:
+                print("Page count unknown; scraping with a single worker.")
+                written = await workers[0]["scraper"].scrape_product_data(workers[0]["page"], sink=sink)
+                self.outcome = workers[0]["scraper"].outcome
+                return written
+
+            slices = split_page_range(total_pages, len(workers))
+            print(f"Assigning page slices: {slices}")
+            results = await asyncio.gather(
+                *(self.scrape_slice(worker, k, start, end) for k, (worker, (start, end)) in enumerate(zip(workers, slices))),
+                return_exceptions=True,
+            )
+            outcomes = []
+            for worker, result in zip(workers, results):
+                if isinstance(result, Exception):
+                    print(f"[worker {worker['id']}] Failed: {result}")
+                    result = "failed"
+                outcomes.append(result)
+            outcomes = await self.retry_failed_slices(workers, slices, outcomes)
+            print(f"Pacing at the end of the run: {pacing.state()}")
+            paths = [self.config.WORKER_OUTPUT_PATTERN.format(k) for k in range(len(slices))]
+            written = self.merge_outputs(paths, sink)
+            failed = [slices[k] for k, outcome in enumerate(outcomes) if outcome not in ("completed", "deadline")]
+            if failed:
+                raise Exception(f"page slices {failed} could not be scraped; only {written} products were merged")
+            self.outcome = "deadline" if "deadline" in outcomes else "completed"
+            return written
+        finally:
+            for worker in workers:
+                try: await worker["context"].close()
+                except Exception as close_err: print(f"[worker {worker['id']}] Error closing context: {close_err}")